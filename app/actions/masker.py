@@ -1,64 +1,81 @@
 import re
-from typing import List, Dict
+from typing import Callable, Dict, List
 
-def _mask_value(hit_type: str, val: str) -> str:
-    s = str(val)
-
-    if hit_type.startswith("api_key"):
-        s_compact = re.sub(r"\s+", "", s)
-        return f"{s_compact[:4]}...{s_compact[-4:]}" if len(s_compact) > 8 else "[api_key masked]"
+_WS = re.compile(r"\s+")
+_NON_DIGIT = re.compile(r"\D")
 
-    if hit_type == "credit_card":
-        digits = re.sub(r"\D", "", s)
-        if len(digits) >= 4:
-            return "XXXX-XXXX-XXXX-" + digits[-4:]
-        return "[card masked]"
 
-    if hit_type == "tckn":
-        return "*" * 7 + s[-4:]
+def _mask_api_key(s: str) -> str:
+    s_compact = _WS.sub("", s)
+    return f"{s_compact[:4]}...{s_compact[-4:]}" if len(s_compact) > 8 else "[api_key masked]"
 
-    if hit_type == "iban":
-        return "TR** **** **** **** **** **"
 
-    if hit_type == "password":
-        return "[password masked]"
+def _mask_card(s: str) -> str:
+    digits = _NON_DIGIT.sub("", s)
+    if len(digits) >= 4:
+        return "XXXX-XXXX-XXXX-" + digits[-4:]
+    return "[card masked]"
 
-    if hit_type == "phone":
-        return "+90 5** *** ** **"
 
-    if hit_type == "email":
-        return "[email masked]"
+def _fixed(mask: str) -> Callable[[str], str]:
+    return lambda s: mask
 
-    if hit_type in {"dob"}:
-        return "[date masked]"
 
-    if hit_type in {"ipv4"}:
-        return "[ip masked]"
+# hit type -> formatter; "api_key.*" types are matched by prefix in _formatter
+_MASKERS: Dict[str, Callable[[str], str]] = {
+    "credit_card": _mask_card,
+    "tckn": lambda s: "*" * 7 + s[-4:],
+    "iban": _fixed("TR** **** **** **** **** **"),
+    "password": _fixed("[password masked]"),
+    "phone": _fixed("+90 5** *** ** **"),
+    "email": _fixed("[email masked]"),
+    "dob": _fixed("[date masked]"),
+    "ipv4": _fixed("[ip masked]"),
+    "mac": _fixed("[mac masked]"),
+    "imei": _fixed("[device id masked]"),
+    "passport": lambda s: "*******" + s[-3:],
+    "driver_license": _fixed("[license masked]"),
+    "health": _fixed("[health info masked]"),
+    "ssn": lambda s: "***-**-" + s[-4:],
+}
+_mask_default = _fixed("[masked]")
 
-    if hit_type in {"mac"}:
-        return "[mac masked]"
 
-    if hit_type in {"imei"}:
-        return "[device id masked]"
-
-    if hit_type in {"passport"}:
-        return "*******" + s[-3:]
-
-    if hit_type in {"driver_license"}:
-        return "[license masked]"
-    
-    if hit_type in {"health"}:
-        return "[health info masked]"
+def _formatter(hit_type: str) -> Callable[[str], str]:
+    if hit_type.startswith("api_key"):
+        return _mask_api_key
+    return _MASKERS.get(hit_type, _mask_default)
 
-    if hit_type == "ssn":
-        return "***-**-" + s[-4:]
 
-    return "[masked]"
+def _mask_value(hit_type: str, val: str) -> str:
+    return _formatter(hit_type)(str(val))
 
 
-def mask_all(text: str, hits: List[Dict]) -> str:
+def _mask_all_overlapping(text: str, hits: List[Dict]) -> str:
+    # Overlapping spans: keep the historical right-to-left splice semantics
     out = text
     for h in sorted(hits, key=lambda x: x["span"][0], reverse=True):
         s, e = h["span"]
         out = out[:s] + _mask_value(h["type"], h["value"]) + out[e:]
-    return out
\ No newline at end of file
+    return out
+
+
+def mask_all(text: str, hits: List[Dict]) -> str:
+    """
+    Replace every hit span with its mask in one forward pass over the spans
+    (sorted by start), joining unmasked gaps and masks once at the end.
+    """
+    if not hits:
+        return text
+    ordered = sorted(hits, key=lambda x: x["span"][0])
+    parts: List[str] = []
+    pos, prev_s = 0, -1
+    for h in ordered:
+        s, e = h["span"]
+        if s < pos or e < s or s == prev_s:
+            return _mask_all_overlapping(text, hits)
+        parts.append(text[pos:s])
+        parts.append(_formatter(h["type"])(str(h["value"])))
+        pos, prev_s = e, s
+    parts.append(text[pos:])
+    return "".join(parts)
@@ -1,68 +1,226 @@
-from typing import Dict, List, Tuple
-
-#  block: critic leak (api_key, card, TCKN, IBAN, password etc.)
-#  mask : personal but not critic (email, phone, dob, ip, mac etc.)
-#  warn : high FP risk - just a warning
-POLICY: Dict[str, str] = {
-    "api_key": "block",
-    "api_key.aws_access_key": "block",
-    "api_key.potential_secret": "block",
-    "api_key.hex": "block",
-    "api_key.jwt": "block",
-
-    "credit_card": "block",
-    "tckn": "block",
-    "iban": "block",
-    "password": "block",
-
-    "email": "mask",
-    "phone": "mask",
-    "dob": "mask",
-    "ssn": "block",
-    "health": "mask",
-    
-
-    "ipv4": "mask",
-    "mac": "mask",
-    "imei": "mask",
-
-    "passport": "mask",
-    "driver_license": "mask",
-}
-
-ENFORCEMENT = {
-    "block": [k for k, v in POLICY.items() if v == "block"],
-    "mask": [k for k, v in POLICY.items() if v == "mask"],
-    "warn": [k for k, v in POLICY.items() if v == "warn"],
-}
-
-
-def decide_actions(hits: List[Dict]) -> Tuple[str, List[str]]:
-    
-   # hits: {"type": "...", "span": (s,e), "value": "..."} 
-   # output: (action, warnings[])
-   # Hardest action is taken if multiple types are detected.
-    
-    has_block = False
-    has_mask = False
-    has_warn = False
-    warnings = []
-
-    for h in hits:
-        htype = h["type"]
-        decision = POLICY.get(htype) or POLICY.get(htype.split(".")[0]) or "allow"
-        if decision == "block":
-            has_block = True
-        elif decision == "mask":
-            has_mask = True
-        elif decision == "warn":
-            has_warn = True
-            warnings.append(f"Detected {htype} with low/medium confidence")
-
-    if has_block:
-        return "block", warnings
-    if has_mask:
-        return "mask", warnings
-    if has_warn:
-        return "warn", warnings
-    return "allow", warnings
\ No newline at end of file
+from __future__ import annotations
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import yaml
+
+from app.detectors.patterns import DETECTORS, Detector
+
+POLICY_PATH = pathlib.Path(__file__).with_name("policy.yaml")
+
+ACTIONS = ("allow", "warn", "mask", "block")  # by severity; the hardest one over all hits wins
+_ACTION_RANK = {a: i for i, a in enumerate(ACTIONS)}
+DEFAULT_PROFILE = "default"
+SCAN_MODES = ("all", "acted")
+
+
+class PolicyError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PolicyEntry:
+    action: str
+    rank: int                 # index in ACTIONS
+    category: str
+    priority: int             # lower wins; -1 = dominant, len(priority list) = unranked ("other")
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """What a profile runs: only the detectors and semantic categories it can act on."""
+    detectors: Optional[List[Detector]]   # None = every detector
+    semantic: Optional[FrozenSet[str]]    # None = every category; empty = semantic stage skipped
+
+    def wants(self, category: str) -> bool:
+        return self.semantic is None or category in self.semantic
+
+
+@dataclass(frozen=True)
+class Verdict:
+    action: str
+    warnings: List[str]
+    label: str
+    category: str
+
+
+class CompiledPolicy:
+    """
+    Policy compiled into a flat hit type -> PolicyEntry table, so a verdict
+    is one dict lookup per hit. Types not seen at compile time (new dotted
+    subtypes) are resolved by the same prefix rules once and memoized.
+    """
+
+    def __init__(self, actions: Dict[str, str], categories: Dict[str, str],
+                 priority: List[str], dominant: List[str], version: str = "", source: str = "",
+                 name: str = DEFAULT_PROFILE, scan: str = "all", semantic: Optional[List[str]] = None):
+        bad = {t: a for t, a in actions.items() if a not in _ACTION_RANK}
+        if bad:
+            raise PolicyError(f"unknown actions {bad} (expected one of {list(ACTIONS)})")
+        if scan not in SCAN_MODES:
+            raise PolicyError(f"profile {name!r}: unknown scan mode {scan!r} (expected one of {SCAN_MODES})")
+        self.actions = dict(actions)
+        self.categories = dict(categories)
+        self.priority = list(priority)
+        self.dominant = list(dominant)
+        self.version = version
+        self.source = source
+        self.name = name
+        self._rank = {c: i for i, c in enumerate(self.priority)}
+        self._table: Dict[str, PolicyEntry] = {}
+        for htype in set(self.actions) | set(self.categories):
+            self._table[htype] = self._compile(htype)
+        self.enforcement = {a: [t for t, v in self.actions.items() if v == a] for a in ACTIONS[1:][::-1]}
+        self.plan = ExecutionPlan(
+            # "acted": drop detectors whose hits this policy would allow anyway
+            detectors=None if scan == "all" else [d for d in DETECTORS if self.entry(d.htype).rank > 0],
+            semantic=None if semantic is None else frozenset(semantic),
+        )
+        self.profiles: Dict[str, "CompiledPolicy"] = {name: self}
+
+    @classmethod
+    def from_dict(cls, data: Dict, version: str = "", source: str = "") -> "CompiledPolicy":
+        """
+        The top level is the default profile. Each entry under `profiles`
+        replaces the top-level keys it sets and scans only the detectors its
+        actions can fire on (`scan: acted`) unless it says `scan: all`.
+        """
+        if not isinstance(data, dict):
+            raise PolicyError("policy must be a mapping")
+        keys = ("actions", "categories", "priority", "dominant")
+        base = {k: data.get(k) or ({} if k in ("actions", "categories") else []) for k in keys}
+        root = cls(**base, version=version, source=source,
+                   scan=data.get("scan", "all"), semantic=data.get("semantic"))
+        for name, spec in (data.get("profiles") or {}).items():
+            if not isinstance(spec, dict):
+                raise PolicyError(f"profile {name!r} must be a mapping")
+            merged = {k: spec.get(k, base[k]) for k in keys}
+            root.profiles[name] = cls(**merged, version=f"{version}:{name}", source=source, name=name,
+                                      scan=spec.get("scan", "acted"), semantic=spec.get("semantic"))
+        return root
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "CompiledPolicy":
+        raw = path.read_bytes()
+        try:
+            data = json.loads(raw) if path.suffix == ".json" else yaml.safe_load(raw)
+        except (ValueError, yaml.YAMLError) as e:
+            raise PolicyError(f"cannot parse {path}: {e}") from e
+        return cls.from_dict(data, version=hashlib.sha256(raw).hexdigest()[:12], source=str(path))
+
+    def profile(self, name: Optional[str]) -> "CompiledPolicy":
+        """The named profile (None = default); KeyError if the policy has no such profile."""
+        return self.profiles[name or DEFAULT_PROFILE]
+
+    def _lookup(self, table: Dict[str, str], htype: str) -> Optional[str]:
+        hit = table.get(htype)
+        return hit if hit is not None else table.get(htype.split(".")[0])
+
+    def _compile(self, htype: str) -> PolicyEntry:
+        action = self._lookup(self.actions, htype) or "allow"
+        base = htype.split(".")[0]
+        if base in self.dominant:
+            category, priority = base, -1
+        else:
+            category = self._lookup(self.categories, htype) or "other"
+            priority = self._rank.get(category, len(self.priority))
+        return PolicyEntry(action, _ACTION_RANK[action], category, priority)
+
+    def entry(self, htype: str) -> PolicyEntry:
+        e = self._table.get(htype)
+        if e is None:
+            e = self._table[htype] = self._compile(htype)
+        return e
+
+    def resolve(self, hits: List[Dict]) -> Verdict:
+        """Action, warnings, label and category for `hits`, in one pass."""
+        if not hits:
+            return Verdict("allow", [], "non_sensitive", "general")
+        rank, warnings, best = 0, [], None
+        for h in hits:
+            e = self.entry(h["type"])
+            if e.rank > rank:
+                rank = e.rank
+            if e.action == "warn":
+                warnings.append(f"Detected {h['type']} with low/medium confidence")
+            if best is None or e.priority < best.priority:
+                best = e
+        category = best.category if best.priority < len(self.priority) else "other"
+        return Verdict(ACTIONS[rank], warnings, "sensitive", category)
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "types": len(self._table),
+            "profiles": {
+                n: {"detectors": len(DETECTORS if p.plan.detectors is None else p.plan.detectors),
+                    "semantic": None if p.plan.semantic is None else sorted(p.plan.semantic)}
+                for n, p in self.profiles.items()
+            },
+        }
+
+
+class PolicyStore:
+    """
+    Holds the live policy and swaps in a recompiled one when the file
+    changes (checked at most every `check_interval` seconds on access) or on
+    `reload()`. A request reads `current()` once and keeps that object, so
+    it never sees half of an old and half of a new policy. A file that does
+    not compile is reported and the previous policy stays in place.
+    """
+
+    def __init__(self, path: pathlib.Path = POLICY_PATH, check_interval: float = 2.0):
+        self.path = pathlib.Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._policy = CompiledPolicy.load(self.path)
+        self._mtime = self._stat()
+        self._checked = time.monotonic()
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def current(self) -> CompiledPolicy:
+        if self.check_interval > 0 and time.monotonic() - self._checked >= self.check_interval:
+            self._checked = time.monotonic()
+            if self._stat() != self._mtime:
+                self.reload()
+        return self._policy
+
+    def reload(self) -> Tuple[bool, CompiledPolicy]:
+        """Recompile from the file; returns (swapped, live policy)."""
+        with self._lock:
+            mtime = self._stat()
+            try:
+                new = CompiledPolicy.load(self.path)
+            except (OSError, PolicyError) as e:
+                self._mtime = mtime  # don't retry the same broken file on every request
+                self.last_error = str(e)
+                print(f"[warn] policy reload failed, keeping version {self._policy.version}: {e}")
+                return False, self._policy
+            self._mtime = mtime
+            self.last_error = None
+            if new.version == self._policy.version:
+                return False, self._policy
+            self._policy = new
+            self.loaded_at = time.time()
+            self.reloads += 1
+            print(f"[info] policy {new.version} loaded from {self.path}")
+            return True, new
+
+    def status(self) -> Dict[str, object]:
+        return {**self._policy.info(), "loaded_at": self.loaded_at, "reloads": self.reloads,
+                "last_error": self.last_error}
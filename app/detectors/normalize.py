@@ -0,0 +1,118 @@
+from __future__ import annotations
+import re
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+_ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff"  # ZWSP, ZWNJ, ZWJ, word joiner, BOM
+
+
+@dataclass(frozen=True)
+class NormalizationStep:
+    name: str                       # also the regex group name
+    pattern: str                    # what to rewrite; must not match the empty string
+    replace: Callable[[str], str]
+
+
+STEPS: Dict[str, NormalizationStep] = {
+    # same output as collapsing every [ \t]+ run, but a lone space is left alone
+    "whitespace": NormalizationStep("whitespace", r"[ \t]{2,}|\t", lambda s: " "),
+    "zero_width": NormalizationStep("zero_width", f"[{_ZERO_WIDTH}]+", lambda s: ""),
+    # per char, so offsets stay exact (no composition across chars); NFKC is the identity on ASCII
+    "nfkc": NormalizationStep("nfkc", f"[^\\x00-\\x7f{_ZERO_WIDTH}]",
+                              lambda s: unicodedata.normalize("NFKC", s)),
+}
+DEFAULT_STEPS = ("whitespace",)
+
+
+class Normalized:
+    """
+    Normalized text plus a sparse offset map back to the original: one
+    entry per rewrite (original start, original end, replacement length),
+    not per char. Chars of a rewrite map to the whole original segment
+    (e.g. a collapsed space covers its full whitespace run).
+    """
+
+    __slots__ = ("text", "original", "_edits", "_nstarts")
+
+    def __init__(self, text: str, original: str, edits: Optional[List[Tuple[int, int, int]]] = None):
+        self.text = text
+        self.original = original
+        self._edits = edits or None
+        self._nstarts: Optional[List[int]] = None  # normalized start of each rewrite, built on first use
+
+    @property
+    def identity(self) -> bool:
+        return self._edits is None
+
+    def _locate(self, n: int) -> Tuple[int, bool]:
+        # (index of the rewrite, True) if normalized char n is part of one, else (original offset, False)
+        if self._nstarts is None:
+            starts, shift = [], 0
+            for s, e, r in self._edits:
+                starts.append(s + shift)
+                shift += r - (e - s)
+            self._nstarts = starts
+        k = bisect_right(self._nstarts, n) - 1
+        if k < 0:
+            return n, False
+        s, e, r = self._edits[k]
+        ns = self._nstarts[k]
+        if n < ns + r:
+            return k, True
+        return e + n - (ns + r), False
+
+    def span(self, s: int, e: int) -> Tuple[int, int]:
+        """Original-text span of the normalized span [s, e)."""
+        if self._edits is None:
+            return s, e
+        if s >= len(self.text):
+            start = len(self.original)
+        else:
+            at, rewritten = self._locate(s)
+            start = self._edits[at][0] if rewritten else at
+        if e <= s:
+            return start, start
+        at, rewritten = self._locate(e - 1)
+        return start, (self._edits[at][1] if rewritten else at + 1)
+
+    def to_original(self, hits: List[Dict]) -> List[Dict]:
+        if self._edits is None:
+            return hits
+        return [{**h, "span": self.span(*h["span"])} for h in hits]
+
+
+class Normalizer:
+    """
+    Applies the enabled steps in one regex pass over the text and records
+    only the rewrites. When nothing needs rewriting, the input string itself
+    is returned (identity map).
+    """
+
+    def __init__(self, steps: Sequence[str] = DEFAULT_STEPS):
+        unknown = [s for s in steps if s not in STEPS]
+        if unknown:
+            raise ValueError(f"unknown normalization steps {unknown} (expected some of {list(STEPS)})")
+        self.steps = tuple(steps)
+        self._replace = {name: STEPS[name].replace for name in self.steps}
+        self._regex = re.compile("|".join(f"(?P<{n}>{STEPS[n].pattern})" for n in self.steps)) \
+            if self.steps else None
+
+    def __call__(self, text: str) -> Normalized:
+        if self._regex is None:
+            return Normalized(text, text)
+        edits: List[Tuple[int, int, int]] = []
+
+        def rewrite(m: re.Match) -> str:
+            old = m.group()
+            new = self._replace[m.lastgroup](old)
+            if new != old:
+                edits.append((m.start(), m.end(), len(new)))
+            return new
+
+        out = self._regex.sub(rewrite, text)
+        return Normalized(out, text, edits) if edits else Normalized(text, text)
+
+
+DEFAULT_NORMALIZER = Normalizer()
@@ -1,5 +1,16 @@
 import re
-from typing import List, Dict, Tuple
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.detectors.normalize import DEFAULT_NORMALIZER, Normalizer
+from app.detectors.profiling import ScanProfile
 
 def normalize_whitespace(s: str) -> str:
     return re.sub(r"[ \t]+", " ", s)
@@ -63,7 +74,10 @@ QRDATA_CODE = re.compile(r"\bQRDATA-\d{3,}\b", re.IGNORECASE)
 
 CRYPTO_WALLET = re.compile(r"\b0x[0-9a-fA-F]{8,64}\b")
 
-TWO_FA_URL = re.compile(r"https?://[^\s]*2fa[^\s]*recovery[^\s]*", re.IGNORECASE)
+# Was `https?://[^\s]*2fa[^\s]*recovery[^\s]*`, quadratic in the URL length. A match
+# always runs to the end of the URL token, so take the token and check the words in
+# _two_fa_ok: same spans, one pass.
+TWO_FA_URL = re.compile(r"https?://[^\s]*", re.IGNORECASE)
 
 EMPLOYMENT_ID = re.compile(r"\bE\d{5,6}\b")
 
@@ -75,12 +89,25 @@ NATIONAL_INSURANCE = re.compile(r"\b[A-CEGHJ-PR-TW-Z]{2}\d{6}[A-D]\b")
 
 
 # Helpers
-def luhn_ok(s: str) -> bool:
-    digits = [int(d) for d in re.sub(r"\D", "", s)]
+_NON_DIGIT = re.compile(r"\D")
+
+# Luhn weights for a digit in a doubled position: 2d, minus 9 when above 9
+_LUHN_DOUBLED = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+_LUHN_WIDTH = 19
+# below this many candidates the NumPy setup costs more than the Python loop
+LUHN_BATCH_MIN = 8
+
+# digits -> Luhn result for the text being validated (see validate_matches)
+_luhn_results: ContextVar[Optional[Dict[str, bool]]] = ContextVar("luhn_results", default=None)
+
+
+@lru_cache(maxsize=4096)
+def _luhn_digits(digits: str) -> bool:
     if not (13 <= len(digits) <= 19):
         return False
     checksum, parity = 0, len(digits) % 2
-    for i, d in enumerate(digits):
+    for i, ch in enumerate(digits):
+        d = ord(ch) - 48
         if i % 2 == parity:
             d *= 2
             if d > 9:
@@ -89,167 +116,500 @@ def luhn_ok(s: str) -> bool:
     return checksum % 10 == 0
 
 
-def find_api_secrets(text: str) -> List[Dict]:
-    hits: List[Dict] = []
+def luhn_table(digit_strings: Iterable[str]) -> Dict[str, bool]:
+    """
+    Luhn-check many digit strings at once: {digits: valid}.
 
-    for m in AWS_ACCESS_KEY.finditer(text):
-        hits.append({"type": "api_key.aws_access_key", "span": m.span(), "value": m.group()})
+    Strings are left-padded with zeros to 19 digits (which leaves the
+    checksum unchanged) and summed as one uint8 matrix.
+    """
+    cands = [d for d in set(digit_strings) if 13 <= len(d) <= _LUHN_WIDTH]
+    if len(cands) < LUHN_BATCH_MIN:
+        return {d: _luhn_digits(d) for d in cands}
+    buf = "".join(d.rjust(_LUHN_WIDTH, "0") for d in cands).encode("ascii")
+    m = np.frombuffer(buf, dtype=np.uint8).reshape(len(cands), _LUHN_WIDTH) - 48
+    # from the right, every second digit is doubled: odd columns when the width is odd
+    m[:, 1::2] = _LUHN_DOUBLED[m[:, 1::2]]
+    ok = m.sum(axis=1, dtype=np.uint16) % 10 == 0
+    return dict(zip(cands, ok.tolist()))
 
-    for m in AWS_SECRET_KEY_40.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 60) : min(len(text), e + 60)]
-        if API_KEY_WORDS.search(window):
-            hits.append({"type": "api_key.potential_secret", "span": (s, e), "value": m.group()})
 
-    for m in HEX_32_64.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 60) : min(len(text), e + 60)]
-        if API_KEY_WORDS.search(window):
-            hits.append({"type": "api_key.hex", "span": (s, e), "value": m.group()})
+def _digits(s: str) -> str:
+    # \d also matches non-ASCII decimals (e.g. fullwidth); map them to ASCII
+    d = _NON_DIGIT.sub("", s)
+    return d if d.isascii() else "".join(str(int(c)) for c in d)
 
-    for m in JWT_CANDIDATE.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 80) : min(len(text), e + 80)]
-        if API_KEY_WORDS.search(window):
-            hits.append({"type": "api_key.jwt", "span": (s, e), "value": m.group()})
 
-    return hits
+def luhn_ok(s: str) -> bool:
+    digits = _digits(s)
+    table = _luhn_results.get()
+    if table is not None:
+        hit = table.get(digits)
+        if hit is not None:
+            return hit
+    return _luhn_digits(digits)
 
 
-def find_phones(text: str) -> List[Dict]:
+# Validators: (text, start, end, value) -> keep the match?
+Validator = Callable[[str, int, int, str], bool]
 
-    """
-    Detects phone numbers in the text.
-    """
-    
-    hits: List[Dict] = []
-    for m in PHONE_CANDIDATE.finditer(text):
-        s, e = m.span()
-        raw = m.group()
 
-        # Check digit count
-        digits_only = re.sub(r"\D", "", raw)
-        if len(digits_only) < 8 or len(digits_only) > 16:
-            continue
+def _card_ok(text: str, s: int, e: int, value: str) -> bool:
+    return luhn_ok(value)
 
-        # Luhn check (to avoid credit card false positives)
-        if 13 <= len(digits_only) <= 19 and luhn_ok(raw):
-            continue
 
-        # If @ found nearby, likely an email - skip
-        window = text[max(0, s - 1):min(len(text), e + 1)]
-        if "@" in window:
-            continue
+def _phone_ok(text: str, s: int, e: int, raw: str) -> bool:
+    # Check digit count
+    digits_only = _NON_DIGIT.sub("", raw)
+    if len(digits_only) < 8 or len(digits_only) > 16:
+        return False
 
-        hits.append({"type": "phone", "span": (s, e), "value": raw})
-    return hits
+    # Luhn check (to avoid credit card false positives)
+    if 13 <= len(digits_only) <= 19 and luhn_ok(raw):
+        return False
 
+    # If @ found nearby, likely an email - skip
+    window = text[max(0, s - 1):min(len(text), e + 1)]
+    return "@" not in window
 
-def _append_hits(hits: List[Dict], regex: re.Pattern, text: str, htype: str):
-    for m in regex.finditer(text):
-        hits.append({"type": htype, "span": m.span(), "value": m.group()})
 
+def _two_fa_ok(text: str, s: int, e: int, value: str) -> bool:
+    rest = value[value.index("://") + 3:].lower()
+    i = rest.find("2fa")
+    return i != -1 and rest.find("recovery", i + 3) != -1
 
-def detect_all(raw_text: str) -> List[Dict]:
-    """
-    Combine all pattern detectors to find PII/sensitive data in the input text.
-    """
-    # normalize (light)
-    text = normalize_whitespace(raw_text)
 
-    hits: List[Dict] = []
+def _near_keywords(radius: int, keywords: List[str]) -> Validator:
+    def _ok(text: str, s: int, e: int, value: str) -> bool:
+        window = text[max(0, s - radius) : min(len(text), e + radius)].lower()
+        return any(k in window for k in keywords)
+    return _ok
 
-    # Basic PII
-    _append_hits(hits, EMAIL, text, "email")
-    _append_hits(hits, SSN, text, "ssn")
 
-    _append_hits(hits, GLOBAL_IBAN, text, "iban")
-    _append_hits(hits, TCKN, text, "tckn")
+def _near_api_words(radius: int) -> Validator:
+    def _ok(text: str, s: int, e: int, value: str) -> bool:
+        window = text[max(0, s - radius) : min(len(text), e + radius)]
+        return bool(API_KEY_WORDS.search(window))
+    return _ok
 
-    # Credit card (validate with Luhn)
-    for m in CC_CANDIDATE.finditer(text):
-        val = m.group()
-        if luhn_ok(val):
-            hits.append({"type": "credit_card", "span": m.span(), "value": val})
 
-    # Birth date
-    _append_hits(hits, DOB1, text, "dob")
-    _append_hits(hits, DOB2, text, "dob")
+_DIGIT_RUN = re.compile(r"\d+")
+_WORD_BOUNDARY = re.compile(r"\b")
 
-    #  Network / Device IDs
-    _append_hits(hits, IPV4, text, "ipv4")
-    _append_hits(hits, MAC, text, "mac")
-    _append_hits(hits, IMEI, text, "imei")
 
+def _finditer_before(regex: re.Pattern, anchor: str, lead: str) -> Callable[[str], Iterator[re.Match]]:
+    """
+    finditer for patterns of the form `\b[lead]+<anchor>...` whose lead run
+    cannot contain the anchor (EMAIL, JWT_CANDIDATE). Plain finditer retries
+    every start inside a long lead run and goes quadratic on runs that never
+    reach the anchor. Here each anchor is tried once, from the leftmost word
+    boundary of the lead run before it: every start in that run consumes the
+    same run up to the anchor, so if the leftmost one fails, all of them do.
+    """
+    lead_chars = frozenset(lead)
+
+    def finditer(text: str) -> Iterator[re.Match]:
+        last_end = 0
+        i = text.find(anchor)
+        while i != -1:
+            lo = i
+            while lo > last_end and text[lo - 1] in lead_chars:
+                lo -= 1
+            start = next((p for p in range(lo, i) if _WORD_BOUNDARY.match(text, p)), None)
+            m = regex.match(text, start) if start is not None else None
+            if m is not None:
+                yield m
+                last_end = m.end()
+            i = text.find(anchor, max(i + 1, last_end))
+    return finditer
+
+
+@dataclass(frozen=True)
+class TextStats:
+    """Cheap character-class facts about a text, collected once per request."""
+    text: str
+    low: Optional[str]       # lowered text; None when not ASCII (case folding differs)
+    digits: int
+    longest_digit_run: int
+    dots: int
+
+    @classmethod
+    def of(cls, text: str) -> "TextStats":
+        runs = [len(r) for r in _DIGIT_RUN.findall(text)]
+        return cls(
+            text=text,
+            low=text.lower() if text.isascii() else None,
+            digits=sum(runs),
+            longest_digit_run=max(runs, default=0),
+            dots=text.count("."),
+        )
+
+
+@dataclass(frozen=True)
+class Precondition:
+    """
+    Minimum a text must contain before a detector can possibly fire.
+    Must be sound: if it fails, the detector's regex + validator cannot match.
+    """
+    min_digits: int = 0
+    min_digit_run: int = 0
+    min_dots: int = 0
+    chars: str = ""                   # every char must occur
+    substrings: Tuple[str, ...] = ()  # at least one must occur (case-sensitive)
+    keywords: Tuple[str, ...] = ()    # at least one must occur (case-insensitive)
+
+    def holds(self, st: TextStats) -> bool:
+        if st.digits < self.min_digits or st.longest_digit_run < self.min_digit_run:
+            return False
+        if st.dots < self.min_dots:
+            return False
+        if any(c not in st.text for c in self.chars):
+            return False
+        if self.substrings and not any(x in st.text for x in self.substrings):
+            return False
+        if self.keywords and st.low is not None and not any(k in st.low for k in self.keywords):
+            return False
+        return True
+
+
+_API_WORD_ROOTS = ("api", "secret", "token", "access", "private", "bearer", "authorization")
+
+
+@dataclass(frozen=True)
+class Detector:
+    name: str                               # unique detector id
+    htype: str                              # hit type reported to policy/masker
+    regex: re.Pattern
+    validate: Optional[Validator] = None
+    requires: Optional[Precondition] = None
+    luhn: bool = False                      # validator Luhn-checks the match digits (batched per text)
+    finder: Optional[Callable[[str], Iterator[re.Match]]] = None  # replaces regex.finditer
+
+    def finditer(self, text: str) -> Iterator[re.Match]:
+        return self.finder(text) if self.finder is not None else self.regex.finditer(text)
+
+
+_ASCII_ALNUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+_EMAIL_LOCAL = _ASCII_ALNUM + "._%+-"   # EMAIL's local-part class
+_JWT_SEGMENT = _ASCII_ALNUM + "_-"      # JWT_CANDIDATE's segment class
+
+# Order matters: dedup keeps the first hit on equal spans.
+DETECTORS: List[Detector] = [
+    # Basic PII
+    Detector("email", "email", EMAIL, requires=Precondition(chars="@."),
+             finder=_finditer_before(EMAIL, "@", _EMAIL_LOCAL)),
+    Detector("ssn", "ssn", SSN, requires=Precondition(min_digits=9, min_digit_run=4, chars="-")),
+    Detector("iban", "iban", GLOBAL_IBAN, requires=Precondition(min_digit_run=2)),
+    Detector("tckn", "tckn", TCKN, requires=Precondition(min_digit_run=11)),
+    # Credit card (validate with Luhn)
+    Detector("credit_card", "credit_card", CC_CANDIDATE, _card_ok,
+             requires=Precondition(min_digits=13), luhn=True),
+    # Birth date
+    Detector("dob1", "dob", DOB1, requires=Precondition(min_digits=8, min_digit_run=4)),
+    Detector("dob2", "dob", DOB2, requires=Precondition(min_digits=8, min_digit_run=4)),
+    # Network / Device IDs
+    Detector("ipv4", "ipv4", IPV4, requires=Precondition(min_digits=4, min_dots=3)),
+    Detector("mac", "mac", MAC, requires=Precondition(substrings=(":", "-"))),
+    Detector("imei", "imei", IMEI, requires=Precondition(min_digit_run=15)),
     # Identities (heuristic)
-    _append_hits(hits, STRIPE_SECRET, text, "api_key.stripe")
-    _append_hits(hits, PASSPORT, text, "passport")
-
-    # context-dependent for driver license
-    for m in DRIVER_LICENSE.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 30) : min(len(text), e + 30)].lower()
-        if any(k in window for k in ["ehliyet", "license", "dl#"]):
-            hits.append({"type": "driver_license", "span": (s, e), "value": m.group()})
-
-    # medical_record_number (MRNxxxx)
-    _append_hits(hits, MEDICAL_RECORD_NUMBER, text, "medical_record_number")
-
-    # vehicle_registration (HSY-3830) 
-    for m in VEHICLE_REG.finditer(text):
-        hits.append({
-            "type": "vehicle_registration",
-            "span": m.span(),
-            "value": m.group()
-        })
+    Detector("stripe", "api_key.stripe", STRIPE_SECRET,
+             requires=Precondition(chars="-", keywords=("sk-",))),
+    Detector("passport", "passport", PASSPORT, requires=Precondition(min_digits=1)),
+    Detector("driver_license", "driver_license", DRIVER_LICENSE,
+             _near_keywords(30, ["ehliyet", "license", "dl#"]),
+             requires=Precondition(keywords=("ehliyet", "license", "dl#"))),
+    Detector("medical_record_number", "medical_record_number", MEDICAL_RECORD_NUMBER,
+             requires=Precondition(min_digit_run=5, keywords=("mrn",))),
+    Detector("vehicle_registration", "vehicle_registration", VEHICLE_REG,
+             requires=Precondition(min_digit_run=3, chars="-")),
     # password / access code (keyword based)
-    _append_hits(hits, PASSWORD_KEYWORDS, text, "password")
+    Detector("password", "password", PASSWORD_KEYWORDS,
+             requires=Precondition(keywords=("pass", "access", "temporary"))),
+    Detector("qr_code", "qr_code", QRDATA_CODE,
+             requires=Precondition(min_digit_run=3, chars="-", keywords=("qrdata-",))),
+    Detector("cryptocurrency_wallet", "cryptocurrency_wallet", CRYPTO_WALLET,
+             requires=Precondition(substrings=("0x",))),
+    Detector("2fa_link", "2fa_link", TWO_FA_URL, _two_fa_ok,
+             requires=Precondition(min_digits=1, chars=":/", keywords=("http",))),
+    # employment_id (E12345 + HR/employee context)
+    Detector("employment_id", "employment_id", EMPLOYMENT_ID,
+             _near_keywords(40, ["employee", "hr record", "hr", "employment"]),
+             requires=Precondition(min_digit_run=5, keywords=("employ", "hr"))),
+    # serial_number (SNXXXXXXX + device context)
+    Detector("serial_number", "serial_number", SERIAL_NUMBER,
+             _near_keywords(40, ["serial", "device id", "device", "sn"]),
+             requires=Precondition(min_digit_run=5, keywords=("sn",))),
+    Detector("pin", "pin", PIN_PATTERN, requires=Precondition(min_digit_run=4, keywords=("pin",))),
+    Detector("national_insurance", "national_insurance", NATIONAL_INSURANCE,
+             requires=Precondition(min_digit_run=6)),
+    # API Keys / Secrets
+    Detector("aws_access_key", "api_key.aws_access_key", AWS_ACCESS_KEY,
+             requires=Precondition(substrings=("AKIA", "ASIA"))),
+    Detector("aws_secret_key", "api_key.potential_secret", AWS_SECRET_KEY_40, _near_api_words(60),
+             requires=Precondition(keywords=_API_WORD_ROOTS)),
+    Detector("hex_secret", "api_key.hex", HEX_32_64, _near_api_words(60),
+             requires=Precondition(keywords=_API_WORD_ROOTS)),
+    Detector("jwt", "api_key.jwt", JWT_CANDIDATE, _near_api_words(80),
+             requires=Precondition(min_dots=2, keywords=_API_WORD_ROOTS),
+             finder=_finditer_before(JWT_CANDIDATE, ".", _JWT_SEGMENT)),
+    Detector("phone", "phone", PHONE_CANDIDATE, _phone_ok,
+             requires=Precondition(min_digits=8), luhn=True),
+    Detector("health", "health", HEALTH_KEYWORDS,
+             requires=Precondition(
+                 keywords=("blood", "allerg", "diabetic", "cholesterol", "medical", "health"))),
+]
 
-    # qr_code
-    _append_hits(hits, QRDATA_CODE, text, "qr_code")
+DETECTORS_BY_NAME: Dict[str, Detector] = {d.name: d for d in DETECTORS}
 
-    # crypto wallet (0x.... + wallet context)
-    for m in CRYPTO_WALLET.finditer(text):
-        hits.append({"type": "cryptocurrency_wallet", "span": m.span(), "value": m.group()})
+_API_SECRET_DETECTORS = ["aws_access_key", "aws_secret_key", "hex_secret", "jwt"]
 
-    # 2FA recovery link
-    _append_hits(hits, TWO_FA_URL, text, "2fa_link")
 
-    # employment_id (E12345 + HR/employee context)
-    for m in EMPLOYMENT_ID.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 40) : min(len(text), e + 40)].lower()
-        if any(k in window for k in ["employee", "hr record", "hr", "employment"]):
-            hits.append({"type": "employment_id", "span": (s, e), "value": m.group()})
+Match = Tuple[int, int, str]  # (start, end, value) before validation
 
-    # serial_number (SNXXXXXXX + device context)
-    for m in SERIAL_NUMBER.finditer(text):
-        s, e = m.span()
-        window = text[max(0, s - 40) : min(len(text), e + 40)].lower()
-        if any(k in window for k in ["serial", "device id", "device", "sn"]):
-            hits.append({"type": "serial_number", "span": (s, e), "value": m.group()})
 
-    # PIN
-    _append_hits(hits, PIN_PATTERN, text, "pin")
+class ScanBudget:
+    """Wall-clock budget for one scan, checked between matches and detectors."""
 
-    # national_insurance
-    _append_hits(hits, NATIONAL_INSURANCE, text, "national_insurance")
+    def __init__(self, ms: float):
+        self.ms = ms
+        self.deadline = time.perf_counter() + ms / 1000.0
 
-    # API Keys / Secrets
-    hits.extend(find_api_secrets(text))
-    hits.extend(find_phones(text))
+    def check(self):
+        if time.perf_counter() > self.deadline:
+            raise _BudgetSpent()
 
-    for m in HEALTH_KEYWORDS.finditer(text):
-        hits.append({"type": "health", "span": m.span(), "value": m.group()})
 
-    # Deduplication
+class _BudgetSpent(Exception):
+    pass
+
+
+class ScanBudgetExceeded(Exception):
+    """The scan ran out of budget; `hits` holds what was found and validated before that."""
+
+    def __init__(self, hits: List[Dict], budget_ms: float):
+        super().__init__(f"detector scan exceeded its {budget_ms:g} ms budget")
+        self.hits = hits
+        self.budget_ms = budget_ms
+
+
+def find_matches(det: Detector, text: str, budget: Optional[ScanBudget] = None) -> List[Match]:
+    if budget is None:
+        return [(m.start(), m.end(), m.group()) for m in det.finditer(text)]
+    budget.check()
+    out: List[Match] = []
+    for m in det.finditer(text):
+        out.append((m.start(), m.end(), m.group()))
+        budget.check()
+    return out
+
+
+def validate_matches(text: str, found: List[Tuple[Detector, List[Match]]],
+                     budget: Optional[ScanBudget] = None, profile: Optional[ScanProfile] = None) -> List[Dict]:
+    """
+    Run each detector's validator over its raw matches; hits come back in
+    the order of `found`. Digit strings of all `luhn` detectors (card and
+    phone candidates often share them) are Luhn-checked once, in one batch.
+    Past `budget`, raises ScanBudgetExceeded with the hits validated so far.
+    With `profile`, records the Luhn batch and each validator's time.
+    """
+    t0 = time.perf_counter() if profile is not None else 0.0
+    digits: List[str] = []
+    for det, matches in found:
+        if det.luhn:
+            digits.extend(_digits(v) for _, _, v in matches)
+    token = _luhn_results.set(luhn_table(digits)) if digits else None
+    if profile is not None and digits:
+        profile.step("luhn", time.perf_counter() - t0, digits=len(digits))
+    hits: List[Dict] = []
+    try:
+        for det, matches in found:
+            if profile is not None and det.validate is not None and matches:
+                t0, before = time.perf_counter(), len(hits)
+            for s, e, val in matches:
+                if budget is not None:
+                    budget.check()
+                if det.validate is None or det.validate(text, s, e, val):
+                    hits.append({"type": det.htype, "span": (s, e), "value": val})
+            if profile is not None and det.validate is not None and matches:
+                profile.validator(det.name, time.perf_counter() - t0, len(matches), len(hits) - before)
+        return hits
+    except _BudgetSpent:
+        raise ScanBudgetExceeded(hits, budget.ms) from None
+    finally:
+        if token is not None:
+            _luhn_results.reset(token)
+
+
+def validate_partial(text: str, found: List[Tuple[Detector, List[Match]]], budget: ScanBudget) -> List[Dict]:
+    """
+    Hits of a scan that ran out of `budget` while matching: the matches found
+    so far, validated under a second budget of the same size.
+    """
+    try:
+        return validate_matches(text, found, ScanBudget(budget.ms))
+    except ScanBudgetExceeded as e:
+        return e.hits
+
+
+def run_detector(det: Detector, text: str) -> List[Dict]:
+    return validate_matches(text, [(det, find_matches(det, text))])
+
+
+def find_api_secrets(text: str) -> List[Dict]:
+    hits: List[Dict] = []
+    for name in _API_SECRET_DETECTORS:
+        hits.extend(run_detector(DETECTORS_BY_NAME[name], text))
+    return hits
+
+
+def find_phones(text: str) -> List[Dict]:
+
+    """
+    Detects phone numbers in the text.
+    """
+
+    return run_detector(DETECTORS_BY_NAME["phone"], text)
+
+
+# Prefilter counters (exposed via /healthz)
+_prefilter_lock = threading.Lock()
+_prefilter_counts: Counter = Counter()
+
+
+def prefilter_detectors(text: str, detectors: Optional[List[Detector]] = None) -> List[Detector]:
+    """
+    Drop detectors whose precondition cannot hold for `text`.
+    """
+    detectors = DETECTORS if detectors is None else detectors
+    st = TextStats.of(text)
+    active: List[Detector] = []
+    skipped: List[str] = []
+    for d in detectors:
+        if d.requires is None or d.requires.holds(st):
+            active.append(d)
+        else:
+            skipped.append(d.name)
+    with _prefilter_lock:
+        _prefilter_counts["texts"] += 1
+        _prefilter_counts["detector_runs"] += len(active)
+        _prefilter_counts["skipped"] += len(skipped)
+        for name in skipped:
+            _prefilter_counts["skipped." + name] += 1
+    return active
+
+
+def prefilter_stats() -> Dict[str, object]:
+    with _prefilter_lock:
+        counts = dict(_prefilter_counts)
+    total = counts.get("detector_runs", 0) + counts.get("skipped", 0)
+    return {
+        "texts": counts.get("texts", 0),
+        "detector_runs": counts.get("detector_runs", 0),
+        "skipped": counts.get("skipped", 0),
+        "skip_ratio": round(counts.get("skipped", 0) / total, 4) if total else 0.0,
+        "skipped_by_detector": {
+            k.split(".", 1)[1]: v for k, v in sorted(counts.items()) if k.startswith("skipped.")
+        },
+    }
+
+
+def scan_sequential(text: str, detectors: Optional[List[Detector]] = None,
+                    budget: Optional[ScanBudget] = None, profile: Optional[ScanProfile] = None) -> List[Dict]:
+    """
+    Reference engine: one finditer pass per detector, in DETECTORS order.
+    With `profile`, each pass is timed.
+    """
+    found: List[Tuple[Detector, List[Match]]] = []
+    try:
+        for det in DETECTORS if detectors is None else detectors:
+            if profile is None:
+                found.append((det, find_matches(det, text, budget)))
+                continue
+            t0 = time.perf_counter()
+            matches = find_matches(det, text, budget)
+            profile.detector(det.name, time.perf_counter() - t0, len(matches))
+            found.append((det, matches))
+    except _BudgetSpent:
+        raise ScanBudgetExceeded(validate_partial(text, found, budget), budget.ms) from None
+    return validate_matches(text, found, budget, profile)
+
+
+def dedup_hits(hits: List[Dict]) -> List[Dict]:
+    # Leftmost first; on equal start the longest span wins, then detector order.
+    # Kept spans are disjoint and sorted, so a hit overlaps one of them iff it
+    # starts before the end of the last kept span: O(n log n) for the sort.
     deduped: List[Dict] = []
-    used_spans: List[Tuple[int, int]] = []
+    covered_to = -1
     for h in sorted(hits, key=lambda x: (x["span"][0], -(x["span"][1] - x["span"][0]))):
         s, e = h["span"]
-        if any(s < ue and e > us for (us, ue) in used_spans):
+        if s < covered_to:
             continue
-        used_spans.append((s, e))
+        covered_to = e
         deduped.append(h)
+    return deduped
+
+
+def detect_all(raw_text: str, scanner=None, prefilter: bool = True,
+               budget: Optional[ScanBudget] = None,
+               normalizer: Optional[Normalizer] = None,
+               detectors: Optional[List[Detector]] = None,
+               profile: Optional[ScanProfile] = None) -> List[Dict]:
+    """
+    Combine all pattern detectors to find PII/sensitive data in the input text.
 
-    return deduped
\ No newline at end of file
+    Detectors run on the normalized text (`normalizer`, default: collapse
+    spaces/tabs); hit spans are mapped back to `raw_text` offsets, values
+    are the normalized matches. `scanner` is an optional engine exposing
+    `scan(text, detectors, budget) -> hits` (see
+    app.detectors.scanner.CombinedScanner); by default every detector runs
+    its own pass over the text. With `prefilter`, detectors whose
+    precondition cannot hold are skipped up front. `detectors` restricts
+    the run to a subset (e.g. a policy profile's plan), in DETECTORS order.
+    When `budget` runs out, raises ScanBudgetExceeded carrying the
+    (deduplicated) partial hits. A `profile` (app.detectors.profiling.
+    ScanProfile) collects per-step and per-detector times; profiled scans
+    always use the sequential engine, so each detector's cost is its own.
+    """
+    if profile is not None:
+        return _detect_profiled(raw_text, prefilter, budget, normalizer, detectors, profile)
+    norm = (normalizer or DEFAULT_NORMALIZER)(raw_text)
+    text = norm.text
+
+    if prefilter:
+        detectors = prefilter_detectors(text, detectors)
+    try:
+        if scanner is not None:
+            hits = scanner.scan(text, detectors, budget=budget)
+        else:
+            hits = scan_sequential(text, detectors, budget=budget)
+    except ScanBudgetExceeded as e:
+        e.hits = norm.to_original(dedup_hits(e.hits))
+        raise
+
+    # Deduplication
+    return norm.to_original(dedup_hits(hits))
+
+
+def _detect_profiled(raw_text: str, prefilter: bool, budget: Optional[ScanBudget],
+                     normalizer: Optional[Normalizer], detectors: Optional[List[Detector]],
+                     profile: ScanProfile) -> List[Dict]:
+    # detect_all with every step timed into `profile`
+    t0 = time.perf_counter()
+    norm = (normalizer or DEFAULT_NORMALIZER)(raw_text)
+    text = norm.text
+    profile.chars += len(text)
+    t1 = time.perf_counter()
+    profile.step("normalize", t1 - t0)
+    if prefilter:
+        n = len(DETECTORS if detectors is None else detectors)
+        detectors = prefilter_detectors(text, detectors)
+        profile.step("prefilter", time.perf_counter() - t1, skipped=n - len(detectors))
+    try:
+        hits = scan_sequential(text, detectors, budget=budget, profile=profile)
+    except ScanBudgetExceeded as e:
+        e.hits = norm.to_original(dedup_hits(e.hits))
+        raise
+    t0 = time.perf_counter()
+    out = dedup_hits(hits)
+    profile.step("dedup", time.perf_counter() - t0, hits=len(hits), kept=len(out))
+    return norm.to_original(out)
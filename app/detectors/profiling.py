@@ -0,0 +1,124 @@
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+
+class ScanProfile:
+    """
+    Wall time and counts of one detect_all call, per step:
+
+    - normalize, prefilter, luhn (the batched check), dedup: one entry each
+    - detectors: per detector, time in its regex/finder and raw matches
+    - validators: per detector, time in its validator, matches checked and kept
+
+    Filled by detect_all(..., profile=...); times are in seconds until
+    `as_dict()`, which reports milliseconds.
+    """
+
+    def __init__(self):
+        self.chars = 0
+        self.steps: Dict[str, Dict[str, float]] = {}
+        self.detectors: Dict[str, Dict[str, float]] = {}
+        self.validators: Dict[str, Dict[str, float]] = {}
+
+    @staticmethod
+    def _add(table: Dict[str, Dict[str, float]], name: str, seconds: float, **counts: float):
+        row = table.get(name)
+        if row is None:
+            row = table[name] = {"s": 0.0, **{k: 0 for k in counts}}
+        row["s"] += seconds
+        for k, v in counts.items():
+            row[k] = row.get(k, 0) + v
+
+    def step(self, name: str, seconds: float, **counts: float):
+        self._add(self.steps, name, seconds, **counts)
+
+    def detector(self, name: str, seconds: float, matches: int):
+        self._add(self.detectors, name, seconds, matches=matches)
+
+    def validator(self, name: str, seconds: float, checked: int, kept: int):
+        self._add(self.validators, name, seconds, checked=checked, kept=kept)
+
+    @staticmethod
+    def _ms(table: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        return {n: {"ms": round(r["s"] * 1000.0, 4), **{k: v for k, v in r.items() if k != "s"}}
+                for n, r in table.items()}
+
+    def total_ms(self) -> float:
+        return round(sum(r["s"] for t in (self.steps, self.detectors, self.validators) for r in t.values())
+                     * 1000.0, 4)
+
+    def as_dict(self) -> Dict[str, object]:
+        # detectors slowest first, so the culprit is on top
+        detectors = dict(sorted(self._ms(self.detectors).items(), key=lambda kv: -kv[1]["ms"]))
+        return {"chars": self.chars, "total_ms": self.total_ms(), "steps": self._ms(self.steps),
+                "detectors": detectors, "validators": self._ms(self.validators)}
+
+
+class ProfileAggregator:
+    """
+    Sums ScanProfiles over many texts (e.g. a replayed corpus) and writes
+    per-detector cost per KB to a JSON file, ranked most expensive first.
+    The file is rewritten at most every `flush_interval` seconds and on
+    `flush()`. A `{pid}` in the path gives each worker its own file.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0):
+        self.path_template = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._profile = ScanProfile()
+        self._texts = 0
+        self._flushed = time.monotonic()
+
+    def add(self, profile: ScanProfile):
+        with self._lock:
+            agg = self._profile
+            agg.chars += profile.chars
+            self._texts += 1
+            for src, dst in ((profile.steps, agg.steps), (profile.detectors, agg.detectors),
+                             (profile.validators, agg.validators)):
+                for name, row in src.items():
+                    ScanProfile._add(dst, name, row["s"], **{k: v for k, v in row.items() if k != "s"})
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def report(self) -> Dict[str, object]:
+        with self._lock:
+            agg, texts = self._profile, self._texts
+            kb = max(agg.chars, 1) / 1024.0
+            rows = []
+            for name in set(agg.detectors) | set(agg.validators):
+                d = agg.detectors.get(name, {})
+                v = agg.validators.get(name, {})
+                ms = (d.get("s", 0.0) + v.get("s", 0.0)) * 1000.0
+                rows.append({"detector": name, "ms_per_kb": round(ms / kb, 5), "ms": round(ms, 3),
+                             "match_ms": round(d.get("s", 0.0) * 1000.0, 3),
+                             "validate_ms": round(v.get("s", 0.0) * 1000.0, 3),
+                             "matches": d.get("matches", 0), "kept": v.get("kept", d.get("matches", 0))})
+            steps = {n: {"ms_per_kb": round(r["s"] * 1000.0 / kb, 5), "ms": round(r["s"] * 1000.0, 3)}
+                     for n, r in agg.steps.items()}
+        rows.sort(key=lambda r: -r["ms_per_kb"])
+        return {"texts": texts, "kb": round(kb, 3), "detectors": rows, "steps": steps}
+
+    @property
+    def path(self) -> Path:
+        return Path(self.path_template.replace("{pid}", str(os.getpid())))
+
+    def flush(self):
+        report = self.report()
+        path = self.path
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(report, indent=2))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[warn] could not write detector profile: {e}")
+        with self._lock:
+            self._flushed = time.monotonic()
@@ -0,0 +1,180 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.detectors.patterns import (
+    DETECTORS, Detector, Match, ScanBudget, ScanBudgetExceeded, _BudgetSpent,
+    validate_matches, validate_partial,
+)
+
+
+@dataclass(frozen=True)
+class ScanGroup:
+    name: str
+    trigger: str          # cheap regex whose match starts are candidate positions
+    members: List[str]    # detector names tried at every candidate
+    lead: str = ""        # leading trigger chars that may hide a candidate right after them
+
+
+# A trigger must find (a superset of) every position its members can start at.
+# Positions hidden inside a consumed trigger match are preceded by a word char,
+# where the members' leading \b / (?<!\w) cannot hold -- except right after a
+# `lead` char, which is retried explicitly.
+SCAN_GROUPS: List[ScanGroup] = [
+    ScanGroup(
+        "numeric",
+        r"[+(\d]\d*",
+        ["ssn", "tckn", "credit_card", "dob1", "dob2", "ipv4", "imei",
+         "cryptocurrency_wallet", "phone"],
+        lead="+(",
+    ),
+    ScanGroup(
+        "upper",
+        r"[A-Z0-9]+",
+        ["passport", "driver_license", "vehicle_registration", "employment_id",
+         "national_insurance", "aws_access_key"],
+    ),
+    ScanGroup("mac", r"[0-9A-Fa-f]{2}[:-]", ["mac"]),
+]
+
+# Keyword detectors: every match starts with one of these (case-insensitive)
+# literals, so candidates come from str.find on the lowered text.
+LITERAL_ANCHORS: Dict[str, List[str]] = {
+    "stripe": ["sk-"],
+    "medical_record_number": ["mrn"],
+    "password": ["pass", "access", "temporary"],
+    "qr_code": ["qrdata-"],
+    "2fa_link": ["http"],
+    "serial_number": ["sn"],
+    "pin": ["pin"],
+    "health": ["blood", "allerg", "diabetic", "cholesterol", "medical", "health"],
+}
+
+
+def _literal_positions(low: str, literals: List[str]) -> List[int]:
+    pos = []
+    for lit in literals:
+        i = low.find(lit)
+        while i != -1:
+            pos.append(i)
+            i = low.find(lit, i + 1)
+    return sorted(set(pos))
+
+
+class CombinedScanner:
+    """
+    Opt-in replacement for the per-detector passes of `scan_sequential`.
+
+    Grouped detectors share one trigger scan, keyword detectors are anchored
+    on literals, and the rest keep their own pass. Every match is routed to
+    its detector's validator and hits come back in DETECTORS order, so
+    `dedup_hits` sees exactly the list the sequential engine builds.
+    """
+
+    def __init__(self, detectors: Optional[List[Detector]] = None,
+                 groups: Optional[List[ScanGroup]] = None,
+                 literals: Optional[Dict[str, List[str]]] = None):
+        self.detectors = list(DETECTORS if detectors is None else detectors)
+        groups = SCAN_GROUPS if groups is None else groups
+        literals = LITERAL_ANCHORS if literals is None else literals
+
+        by_name = {d.name: d for d in self.detectors}
+        claimed = set()
+        self.groups = []
+        for g in groups:
+            dets = [by_name[n] for n in g.members if n in by_name and n not in claimed]
+            if dets:
+                self.groups.append((re.compile(g.trigger), dets, g.lead))
+                claimed.update(d.name for d in dets)
+        self.anchored = [
+            (by_name[n], [lit.lower() for lit in lits])
+            for n, lits in literals.items() if n in by_name and n not in claimed
+        ]
+        claimed.update(d.name for d, _ in self.anchored)
+        self.solo = [d for d in self.detectors if d.name not in claimed]
+
+    @staticmethod
+    def _emit(det: Detector, text: str, m: re.Match, out: Dict[str, List[Match]]):
+        # validators run once all matches are in (see validate_matches)
+        out[det.name].append((m.start(), m.end(), m.group()))
+
+    def _scan_group(self, trigger: re.Pattern, dets: List[Detector], lead: str, text: str,
+                    out: Dict[str, List[Match]], budget: Optional[ScanBudget]):
+        # finditer semantics per detector: the next match starts at/after the last end
+        last_end = [0] * len(dets)
+        for t in trigger.finditer(text):
+            if budget is not None:
+                budget.check()
+            start, end = t.span()
+            cands = (start, start + 1) if text[start] in lead and end > start + 1 else (start,)
+            for pos in cands:
+                for i, det in enumerate(dets):
+                    if pos < last_end[i]:
+                        continue
+                    m = det.regex.match(text, pos)
+                    if m is not None:
+                        last_end[i] = m.end()
+                        self._emit(det, text, m, out)
+
+    def _scan_anchored(self, det: Detector, positions: List[int], text: str,
+                       out: Dict[str, List[Match]], budget: Optional[ScanBudget]):
+        last_end = 0
+        for pos in positions:
+            if budget is not None:
+                budget.check()
+            if pos < last_end:
+                continue
+            m = det.regex.match(text, pos)
+            if m is not None:
+                last_end = m.end()
+                self._emit(det, text, m, out)
+
+    def scan(self, text: str, detectors: Optional[List[Detector]] = None,
+             budget: Optional[ScanBudget] = None) -> List[Dict]:
+        """
+        `detectors` optionally restricts the run (e.g. after the prefilter).
+        Past `budget`, raises ScanBudgetExceeded with the hits found so far.
+        """
+        if detectors is None:
+            active = None
+            out: Dict[str, List[Match]] = {d.name: [] for d in self.detectors}
+        else:
+            active = {d.name for d in detectors}
+            out = {d.name: [] for d in self.detectors if d.name in active}
+
+        found = [(d, out[d.name]) for d in self.detectors if d.name in out]
+        try:
+            self._scan(text, active, out, budget)
+        except _BudgetSpent:
+            raise ScanBudgetExceeded(validate_partial(text, found, budget), budget.ms) from None
+        return validate_matches(text, found, budget)
+
+    def _scan(self, text: str, active, out: Dict[str, List[Match]], budget: Optional[ScanBudget]):
+        for trigger, dets, lead in self.groups:
+            if active is not None:
+                dets = [d for d in dets if d.name in active]
+                if not dets:
+                    continue
+            self._scan_group(trigger, dets, lead, text, out, budget)
+
+        anchored = self.anchored if active is None else [a for a in self.anchored if a[0].name in active]
+        if anchored:
+            # str.lower() only mirrors re.IGNORECASE (and keeps offsets) for ASCII
+            if text.isascii():
+                low = text.lower()
+                for det, lits in anchored:
+                    self._scan_anchored(det, _literal_positions(low, lits), text, out, budget)
+            else:
+                for det, _ in anchored:
+                    for m in det.finditer(text):
+                        if budget is not None:
+                            budget.check()
+                        self._emit(det, text, m, out)
+
+        for det in self.solo:
+            if active is not None and det.name not in active:
+                continue
+            for m in det.finditer(text):
+                if budget is not None:
+                    budget.check()
+                self._emit(det, text, m, out)
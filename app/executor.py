@@ -0,0 +1,97 @@
+from __future__ import annotations
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+
+from app.semantic.batcher import WAIT_MS_BUCKETS, _bucket
+
+T = TypeVar("T")
+
+
+class Overloaded(Exception):
+    """Admission queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Fixed-size thread pool for the CPU-bound moderation work, with a bounded
+    admission queue: at most `workers` calls run and `queue_max` wait; any
+    further call fails fast with `Overloaded` instead of piling up threads.
+    """
+
+    def __init__(self, workers: int = 4, queue_max: int = 64):
+        self.workers = max(workers, 1)
+        self.queue_max = max(queue_max, 0)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="moderate")
+        self._lock = threading.Lock()
+        self._admitted = 0  # queued + running
+        self._running = 0
+        self._stats: Dict[str, float] = {
+            "completed": 0, "rejected": 0, "wait_ms_sum": 0.0, "wait_ms_max": 0.0, "run_ms_sum": 0.0,
+        }
+        self._wait_hist: Dict[str, int] = {}
+
+    def _retry_after(self) -> int:
+        # time for the current backlog to drain, from the average run time so far
+        done = self._stats["completed"]
+        avg_s = self._stats["run_ms_sum"] / done / 1000.0 if done else 0.05
+        return max(1, math.ceil(self._admitted * avg_s / self.workers))
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.workers + self.queue_max:
+                self._stats["rejected"] += 1
+                raise Overloaded(self._retry_after())
+            self._admitted += 1
+
+    def _call(self, enqueued: float, fn: Callable[..., T], args) -> T:
+        started = time.perf_counter()
+        wait_ms = (started - enqueued) * 1000.0
+        with self._lock:
+            self._running += 1
+            self._stats["wait_ms_sum"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            key = _bucket(WAIT_MS_BUCKETS, wait_ms)
+            self._wait_hist[key] = self._wait_hist.get(key, 0) + 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._admitted -= 1
+                self._stats["completed"] += 1
+                self._stats["run_ms_sum"] += (time.perf_counter() - started) * 1000.0
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        self._admit()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._call, time.perf_counter(), fn, args)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            st = dict(self._stats)
+            hist = dict(self._wait_hist)
+            admitted, running = self._admitted, self._running
+        done = st["completed"] or 1
+        return {
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "queue_depth": admitted - running,
+            "running": running,
+            "completed": int(st["completed"]),
+            "rejected": int(st["rejected"]),
+            "wait_ms_avg": round(st["wait_ms_sum"] / done, 3),
+            "wait_ms_max": round(st["wait_ms_max"], 3),
+            "run_ms_avg": round(st["run_ms_sum"] / done, 3),
+            "wait_ms_hist": hist,
+        }
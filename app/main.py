@@ -1,15 +1,28 @@
 from __future__ import annotations
+import atexit
 import os
+import time
 from typing import List, Dict, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-from app.detectors.patterns import detect_all
+from app.detectors.normalize import Normalizer
+from app.detectors.profiling import ProfileAggregator, ScanProfile
+from app.detectors.patterns import ScanBudget, ScanBudgetExceeded, detect_all, prefilter_stats
+from app.detectors.scanner import CombinedScanner
 from app.actions.masker import mask_all
-from app.actions.policy import decide_actions, ENFORCEMENT, POLICY
+from app.actions.policy import POLICY_PATH, PolicyStore
 
+from app.executor import BoundedExecutor, Overloaded
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, ModerationMetrics
+from app.pipeline import ModerationContext, Stage, StagedPipeline
+from app.semantic.batcher import MicroBatcher
+from app.streaming import DEFAULT_HOLD, Region, StreamScanner
 from app.semantic.heuristics import is_adversarial, is_address_like
-from app.semantic.semantic_utils import load_semantic_model, semantic_debug_info
+from app.semantic.semantic_utils import (
+    SemanticLoader, after_fork, load_semantic_model, prepare_for_fork, semantic_debug_info,
+)
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -19,106 +32,80 @@ SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L
 SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_THRESHOLD", "0.45"))
 SEMANTIC_ALPHA = float(os.getenv("SEMANTIC_ALPHA", "0.30"))
 SEMANTIC_DEBUG = os.getenv("SEMANTIC_DEBUG", "1") not in {"0", "false", "False"}
-
-_semantic = load_semantic_model(
+SEMANTIC_BATCH_WINDOW_MS = float(os.getenv("SEMANTIC_BATCH_WINDOW_MS", "0"))  # 0 = no micro-batching
+SEMANTIC_BATCH_MAX = int(os.getenv("SEMANTIC_BATCH_MAX", "32"))
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "1") not in {"0", "false", "False"}
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEMANTIC_MODEL_REVISION = os.getenv("SEMANTIC_MODEL_REVISION") or None  # pin a hub commit/tag
+SEMANTIC_BANK_CACHE_DIR = os.getenv("SEMANTIC_BANK_CACHE_DIR", ".cache/semantic")  # "" = no on-disk bank
+SEMANTIC_BACKEND = os.getenv("SEMANTIC_BACKEND", "torch")  # torch | onnx | onnx-int8
+SEMANTIC_ONNX_FILE = os.getenv("SEMANTIC_ONNX_FILE") or None  # e.g. onnx/model_qint8_avx512_vnni.onnx
+SEMANTIC_CHUNK_CHARS = int(os.getenv("SEMANTIC_CHUNK_CHARS", "1000"))  # longer texts scored per chunk; 0 = off
+SEMANTIC_MAX_CHUNKS = int(os.getenv("SEMANTIC_MAX_CHUNKS", "16"))
+SEMANTIC_ANN = os.getenv("SEMANTIC_ANN", "off")  # off | ivf | hnsw (needs hnswlib)
+SEMANTIC_ANN_RECALL = float(os.getenv("SEMANTIC_ANN_RECALL", "0.95"))  # target recall@k of the index
+SEMANTIC_ANN_K = int(os.getenv("SEMANTIC_ANN_K", "10"))
+SEMANTIC_ANN_MIN_ROWS = int(os.getenv("SEMANTIC_ANN_MIN_ROWS", "4096"))  # smaller banks stay exact
+SEMANTIC_LOAD = os.getenv("SEMANTIC_LOAD", "background")  # background | blocking
+DETECTOR_ENGINE = os.getenv("DETECTOR_ENGINE", "sequential")  # sequential | combined
+DETECTOR_PREFILTER = os.getenv("DETECTOR_PREFILTER", "1") not in {"0", "false", "False"}
+DETECTOR_NORMALIZE = os.getenv("DETECTOR_NORMALIZE", "whitespace")  # comma list: whitespace,zero_width,nfkc
+DETECTOR_MAX_CHARS = int(os.getenv("DETECTOR_MAX_CHARS", "0"))  # longer inputs take the fallback; 0 = no limit
+DETECTOR_BUDGET_MS = float(os.getenv("DETECTOR_BUDGET_MS", "0"))  # per-text scan budget; 0 = none
+DETECTOR_PROFILE = os.getenv("DETECTOR_PROFILE", "0") not in {"0", "false", "False"}  # profile every text
+DETECTOR_PROFILE_FILE = os.getenv("DETECTOR_PROFILE_FILE", "")  # aggregated per-detector costs; "" = off
+DETECTOR_FALLBACK = os.getenv("DETECTOR_FALLBACK", "block")  # block | partial
+POLICY_FILE = os.getenv("POLICY_FILE") or str(POLICY_PATH)  # YAML or JSON
+POLICY_RELOAD_INTERVAL_S = float(os.getenv("POLICY_RELOAD_INTERVAL_S", "2"))  # file change check; 0 = off
+RULES_RELOAD_INTERVAL_S = float(os.getenv("RULES_RELOAD_INTERVAL_S", "2"))  # rules.yaml change check; 0 = off
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None  # X-Admin-Token for /admin/*; unset = admin endpoints off
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") not in {"0", "false", "False"}  # /metrics + stage timing
+MODERATE_BATCH_MAX = int(os.getenv("MODERATE_BATCH_MAX", "256"))
+MODERATE_WORKERS = int(os.getenv("MODERATE_WORKERS", str(min(os.cpu_count() or 1, 4))))
+MODERATE_QUEUE_MAX = int(os.getenv("MODERATE_QUEUE_MAX", "64"))  # waiting requests before 503
+STREAM_HOLD_CHARS = int(os.getenv("STREAM_HOLD_CHARS", str(DEFAULT_HOLD)))  # >= longest match + context
+
+_scanner = CombinedScanner() if DETECTOR_ENGINE == "combined" else None
+_policy = PolicyStore(POLICY_FILE, check_interval=POLICY_RELOAD_INTERVAL_S)
+_normalizer = Normalizer([s.strip() for s in DETECTOR_NORMALIZE.split(",") if s.strip()])
+_metrics = ModerationMetrics() if METRICS_ENABLED else None
+_profile_agg = ProfileAggregator(DETECTOR_PROFILE_FILE) if DETECTOR_PROFILE_FILE else None
+if _profile_agg is not None:
+    atexit.register(_profile_agg.flush)
+_executor = BoundedExecutor(workers=MODERATE_WORKERS, queue_max=MODERATE_QUEUE_MAX)
+
+_semantic_loader = SemanticLoader(lambda: load_semantic_model(
     enabled=SEMANTIC_ENABLED,
     model_name=SEMANTIC_MODEL,
     threshold=SEMANTIC_THRESHOLD,
     alpha=SEMANTIC_ALPHA,
-)
+    batch_window_ms=SEMANTIC_BATCH_WINDOW_MS,
+    batch_max=SEMANTIC_BATCH_MAX,
+    cache_entries=SEMANTIC_CACHE_MAX_ENTRIES if SEMANTIC_CACHE else 0,
+    cache_bytes=SEMANTIC_CACHE_MAX_BYTES,
+    neighbors=SEMANTIC_DEBUG,
+    bank_cache_dir=SEMANTIC_BANK_CACHE_DIR,
+    model_revision=SEMANTIC_MODEL_REVISION,
+    backend=SEMANTIC_BACKEND,
+    onnx_file=SEMANTIC_ONNX_FILE,
+    chunk_chars=SEMANTIC_CHUNK_CHARS,
+    max_chunks=SEMANTIC_MAX_CHUNKS,
+    ann=SEMANTIC_ANN,
+    ann_recall=SEMANTIC_ANN_RECALL,
+    ann_k=SEMANTIC_ANN_K,
+    ann_min_rows=SEMANTIC_ANN_MIN_ROWS,
+), enabled=SEMANTIC_ENABLED).start(background=SEMANTIC_LOAD != "blocking")
+
+SEMANTIC_PENDING_WARNING = "semantic: pending"
 
 
 app = FastAPI(title="LLM Security Gateway", version="0.4.3")
 
-# Match type to dataset category
-DATASET_CATEGORY_MAP: Dict[str, str] = {
-    # PII / IDs
-    "credit_card": "credit_card",
-    "iban": "bank_account",
-    "tckn": "tckn",
-    "email": "email",
-    "phone": "phone",
-    "dob": "dob",
-    "ipv4": "ip",
-    "mac": "mac",
-    "imei": "imei",
-    "passport": "passport",
-    "driver_license": "driver_license",
-    "ssn": "ssn",
-    "health": "health",
-    "address": "address",
-    "medical_record_number": "medical_record_number",
-    "vehicle_registration": "vehicle_registration",
-    "password": "password",
-    "qr_code": "qr_code",
-    "cryptocurrency_wallet": "cryptocurrency_wallet",
-    "2fa_link": "2fa_link",
-    "employment_id": "employment_id",
-    "serial_number": "serial_number",
-    "pin": "pin",
-    "national_insurance": "national_insurance",
-    "api_key": "api_key",
-    "api_key.aws_access_key": "api_key",
-    "api_key.potential_secret": "api_key",
-    "api_key.hex": "api_key",
-    "api_key.jwt": "jwt",
-}
-
-def _map_category(htype: str) -> Optional[str]:
-    if htype in DATASET_CATEGORY_MAP:
-        return DATASET_CATEGORY_MAP[htype]
-    return DATASET_CATEGORY_MAP.get(htype.split(".")[0])
-
-PRIORITY_ORDER = [
-    "api_key",        
-    "ssn",
-    "credit_card",
-    "bank_account",
-    "tckn",
-    "passport",
-    "driver_license",
-    "medical_record_number",
-    "cryptocurrency_wallet",
-    "2fa_link",
-    "password",
-    "pin",
-    "vehicle_registration",
-    "employment_id",
-    "serial_number",
-    "email",
-    "phone",
-    "address",
-    "health",
-    "other",
-]
-
-def _compute_label_category(hits):
-    if not hits:
-        return {"label":"non_sensitive","category":"general"}
-
-    # map types -> simple base name if dotted
-    mapped = []
-    for h in hits:
-        base = h["type"].split(".")[0]
-        cat = _map_category(h["type"]) or _map_category(base)
-        mapped.append((base, cat, h))
-
-    # if any api_key.stripe -> choose api_key immediately
-    for base, cat, h in mapped:
-        if base == "api_key" or "stripe" in h.get("type",""):
-            return {"label":"sensitive","category":"api_key"}
-
-    # enforce explicit priority
-    for p in PRIORITY_ORDER:
-        for base, cat, h in mapped:
-            if cat == p:
-                return {"label":"sensitive","category":cat}
-
-    # fallback
-    return {"label":"sensitive","category":"other"}
-
 class ModerateIn(BaseModel):
     text: str
+    profile: Optional[str] = None  # policy profile; else the X-Policy-Profile header; else default
+    debug_profile: bool = False    # return per-detector timings in `profile`
 
 class ModerateOut(BaseModel):
     action: str               # allow | warn | mask | block
@@ -127,49 +114,148 @@ class ModerateOut(BaseModel):
     text: str
     hits: List[Dict]
     warnings: Optional[List[str]] = None
+    stages: Optional[List[str]] = None  # pipeline stages that ran for this text
+    profile: Optional[Dict] = None  # detector timings (debug_profile / DETECTOR_PROFILE)
 
+class ModerateBatchIn(BaseModel):
+    texts: List[str]
+    profile: Optional[str] = None  # one profile for the whole batch
+    debug_profile: bool = False
 
-# Endpoints
-@app.get("/healthz")
-def healthz():
+class ModerateBatchOut(BaseModel):
+    results: List[ModerateOut]  # same order as the input texts; blocks carry the suggested text
+
+
+def _blocked(msg: str, label: str, category: str, suggested_text: str,
+             hits: List[Dict], warnings: List[str]) -> Dict:
     return {
-        "ok": True,
-        "version": app.version,
-        "semantic_enabled": bool(_semantic is not None and SEMANTIC_ENABLED),
+        "action": "block",
+        "label": label,
+        "category": category,
+        "text": suggested_text,
+        "hits": hits,
+        "warnings": warnings,
+        "msg": msg,
     }
 
 
-@app.post("/moderate", response_model=ModerateOut)
-def moderate(payload: ModerateIn):
-    text = (payload.text or "").strip()
-
-    # Regex 
-    hits = detect_all(text)
-    cls = _compute_label_category(hits)  # {"label": ..., "category": ...}
+# Stages, cheapest first. Each one only runs for texts whose verdict it can still change.
+def _stage_regex(ctxs: List[ModerationContext]):
+    for c in ctxs:
+        text = c.text
+        if DETECTOR_MAX_CHARS and len(text) > DETECTOR_MAX_CHARS:
+            c.scan_warning = f"scan incomplete: input longer than {DETECTOR_MAX_CHARS} chars"
+            if DETECTOR_FALLBACK != "partial":
+                c.unscanned = True
+                continue
+            text = text[:DETECTOR_MAX_CHARS]
+        budget = ScanBudget(DETECTOR_BUDGET_MS) if DETECTOR_BUDGET_MS > 0 else None
+        try:
+            c.hits = detect_all(text, scanner=_scanner, prefilter=DETECTOR_PREFILTER, budget=budget,
+                                normalizer=_normalizer, detectors=c.policy.plan.detectors,
+                                profile=c.scan_profile)
+        except ScanBudgetExceeded as e:
+            print(f"[warn] {e} ({len(text)} chars, fallback={DETECTOR_FALLBACK})")
+            c.scan_warning = f"scan incomplete: {DETECTOR_BUDGET_MS:g} ms budget exceeded"
+            c.hits = e.hits
+            c.unscanned = DETECTOR_FALLBACK != "partial"
+
+
+def _stage_policy(ctxs: List[ModerationContext]):
+    for c in ctxs:
+        v = c.policy.resolve(c.hits)
+        c.cls = {"label": v.label, "category": v.category}
+        c.action, c.policy_warnings = v.action, v.warnings
+
+
+def _stage_heuristics(ctxs: List[ModerationContext]):
+    for c in ctxs:
+        plan = c.policy.plan
+        c.adversarial = plan.wants("adversarial") and is_adversarial(c.text)
+        # only consulted for hit-free, non-adversarial texts
+        c.address_like = (not c.hits and not c.adversarial and plan.wants("address")
+                          and is_address_like(c.text))
+
+
+def _semantic_can_change(c: ModerationContext) -> bool:
+    """
+    Whether the semantic result can still change action, label or category
+    (mirrors the branches of `_verdict`).
+    """
+    if c.unscanned:
+        return False  # blocked by the scan fallback
+    if c.policy.plan.semantic is not None and not c.policy.plan.semantic:
+        return False  # the profile acts on no semantic category
+    if not c.hits:
+        # adversarial: block vs warn; address-like: fixed warn; otherwise semantic decides
+        return c.adversarial or not c.address_like
+    if c.action == "block":
+        return False  # block is final; category comes from hits + heuristics
+    if c.action == "allow":
+        return True   # semantic "sensitive" upgrades to warn
+    return c.adversarial  # mask/warn: only an adversarial semantic score can turn it into block
+
+
+def _stage_semantic(ctxs: List[ModerationContext]):
+    sem = _semantic_model()
+    sem.poll_rules(RULES_RELOAD_INTERVAL_S)
+    groups: Dict[Optional[frozenset], List[ModerationContext]] = {}
+    for c in ctxs:
+        groups.setdefault(c.policy.plan.semantic, []).append(c)
+    timings: Optional[Dict[str, float]] = {} if _metrics is not None else None
+    for categories, group in groups.items():
+        for c, r in zip(group, sem.classify_batch([c.text for c in group], categories=categories,
+                                                  timings=timings)):
+            c.sem_res = r
+    if timings:
+        _metrics.observe_stage("semantic_embed", timings["embed"])
+        _metrics.observe_stage("semantic_score", timings["score"])
+
+
+_pipeline = StagedPipeline([
+    Stage("regex", cost=1.0, run=_stage_regex),
+    Stage("policy", cost=0.05, run=_stage_policy),
+    Stage("heuristics", cost=0.5, run=_stage_heuristics),
+    Stage("semantic", cost=50.0, run=_stage_semantic,
+          needed=lambda c: _semantic_model() is not None and _semantic_can_change(c)),
+], observe=_metrics.observe_stage if _metrics is not None else None)
+
+
+def _masked(text: str, hits: List[Dict]) -> str:
+    if _metrics is None:
+        return mask_all(text, hits)
+    t0 = time.perf_counter()
+    out = mask_all(text, hits)
+    _metrics.observe_stage("mask", time.perf_counter() - t0)
+    return out
+
+
+def _verdict(c: ModerationContext) -> Dict:
+    """
+    Verdict for one (already stripped) text once the stages have run.
+    Blocks are returned as action="block" with the suggested text; the
+    single-text endpoint turns them into a 422.
+    """
+    text, hits, cls = c.text, c.hits, c.cls
+
+    if c.unscanned:
+        # detectors could not finish on this input (DETECTOR_FALLBACK=block)
+        return _blocked(
+            "Input could not be fully scanned.", "sensitive", "unscanned",
+            _masked(text, hits), hits, [c.scan_warning],
+        )
 
     # Semantic (embedding) 
-    sem_label, sem_category, sem_score, sem_warn = "non_sensitive", "general", 0.0, []
-    if SEMANTIC_ENABLED and _semantic:
-        sem_label, sem_category, sem_score, sem_warn = semantic_debug_info(
-            _semantic.classify(text)
-        )
+    sem_label, sem_category, sem_score, sem_warn = semantic_debug_info(c.sem_res)
 
     # Heuristic (semantic + text-based)
     if not hits:
         
-        if is_adversarial(text):
+        if c.adversarial:
             if sem_category == "adversarial" and sem_score >= 0.70:
-                raise HTTPException(
-                    status_code=422,
-                    detail={
-                        "msg": "Adversarial content detected.",
-                        "enforcement": ENFORCEMENT,
-                        "label": "sensitive",
-                        "category": "adversarial",
-                        "suggested_text": text,
-                        "hits": [],
-                        "warnings": sem_warn + ["Adversarial (heuristic, high confidence)"],
-                    },
+                return _blocked(
+                    "Adversarial content detected.", "sensitive", "adversarial", text, [],
+                    sem_warn + ["Adversarial (heuristic, high confidence)"],
                 )
             return {
                 "action": "warn",
@@ -181,7 +267,7 @@ def moderate(payload: ModerateIn):
             }
 
 
-        if is_address_like(text):
+        if c.address_like:
             return {
                 "action": "warn",
                 "label": "sensitive",
@@ -194,17 +280,9 @@ def moderate(payload: ModerateIn):
 
         if sem_label == "sensitive":
             if sem_category == "adversarial" and sem_score >= 0.70:
-                raise HTTPException(
-                    status_code=422,
-                    detail={
-                        "msg": "Adversarial content detected.",
-                        "enforcement": ENFORCEMENT,
-                        "label": sem_label,
-                        "category": sem_category,
-                        "suggested_text": text,
-                        "hits": [],
-                        "warnings": sem_warn + [f"Semantic risk: {sem_category} ({sem_score:.2f})"],
-                    },
+                return _blocked(
+                    "Adversarial content detected.", sem_label, sem_category, text, [],
+                    sem_warn + [f"Semantic risk: {sem_category} ({sem_score:.2f})"],
                 )
             return {
                 "action": "warn",
@@ -226,12 +304,12 @@ def moderate(payload: ModerateIn):
         }
 
 
-    action, warnings = decide_actions(hits)
+    action, warnings = c.action, list(c.policy_warnings)
     warnings = (warnings or []) + sem_warn
 
 
     category_override = None
-    if is_adversarial(text):
+    if c.adversarial:
         category_override = "adversarial"
 
         if sem_category == "adversarial" and sem_score >= 0.70:
@@ -256,18 +334,9 @@ def moderate(payload: ModerateIn):
 
 
     if action == "block":
-        masked = mask_all(text, hits)
-        raise HTTPException(
-            status_code=422,
-            detail={
-                "msg": "Sensitive or adversarial content detected.",
-                "enforcement": ENFORCEMENT,
-                "label": out_label,
-                "category": out_category,
-                "suggested_text": masked,
-                "hits": hits,
-                "warnings": warnings,
-            },
+        return _blocked(
+            "Sensitive or adversarial content detected.", out_label, out_category,
+            _masked(text, hits), hits, warnings,
         )
 
     if action == "mask":
@@ -275,7 +344,7 @@ def moderate(payload: ModerateIn):
             "action": "mask",
             "label": out_label,
             "category": out_category,
-            "text": mask_all(text, hits),
+            "text": _masked(text, hits),
             "hits": hits,
             "warnings": warnings,
         }
@@ -298,4 +367,258 @@ def moderate(payload: ModerateIn):
         "text": text,
         "hits": hits,
         "warnings": warnings,
-    }
\ No newline at end of file
+    }
+
+
+def _semantic_model():
+    # None while loading, when disabled, or if the load failed
+    return _semantic_loader.get() if SEMANTIC_ENABLED else None
+
+
+def prepare_workers():
+    # app.serve parent: finish loading, then make the loaded state safe to share by fork
+    _semantic_loader.wait()
+    prepare_for_fork(_semantic_model())
+
+
+def init_worker():
+    # app.serve worker, right after fork
+    after_fork(_semantic_model())
+    if _metrics is not None:
+        _metrics.after_fork()
+
+
+def _mark_semantic_pending(out: Dict, c: ModerationContext) -> Dict:
+    # Served by regex + heuristics only; flag it where the model could still change the verdict
+    if _semantic_loader.pending and _semantic_can_change(c):
+        out["warnings"] = (out["warnings"] or []) + [SEMANTIC_PENDING_WARNING]
+    return out
+
+
+def _profile(name: Optional[str]):
+    # the live policy's profile, resolved once per request
+    try:
+        return _policy.current().profile(name)
+    except KeyError:
+        raise HTTPException(status_code=400, detail={"msg": f"Unknown policy profile {name!r}."})
+
+
+def _moderate(texts: List[str], policy, profile: bool = False) -> List[Dict]:
+    profile = profile or DETECTOR_PROFILE or _profile_agg is not None
+    ctxs = _pipeline.run([ModerationContext(t, policy=policy, scan_profile=ScanProfile() if profile else None)
+                          for t in texts])
+    out = []
+    for c in ctxs:
+        res = _mark_semantic_pending(_verdict(c), c)
+        if res["action"] == "block":
+            res["enforcement"] = c.policy.enforcement
+        if c.scan_warning and not c.unscanned:
+            res["warnings"] = (res["warnings"] or []) + [c.scan_warning]
+        res["stages"] = c.stages
+        if _metrics is not None:
+            _metrics.observe_result(c.text, res)
+        if c.scan_profile is not None:
+            res["profile"] = c.scan_profile.as_dict()
+            if _profile_agg is not None:
+                _profile_agg.add(c.scan_profile)
+        out.append(res)
+    return out
+
+
+class _StreamVerdict:
+    """
+    Running verdict of a stream: regex + policy + adversarial heuristic
+    (semantic and address checks need the whole text). Keeps one hit per
+    type, so its size does not grow with the stream.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy  # profile snapshot for the whole stream
+        self.first_hit: Dict[str, Dict] = {}
+        self.adversarial = False
+        self.tail = ""  # end of the previous region, for patterns across the boundary
+        self.last: Optional[Dict] = None
+
+    def verdict(self, final: bool = False) -> Dict:
+        v = self.policy.resolve(list(self.first_hit.values()))
+        action, label, category = v.action, v.label, v.category
+        if self.adversarial:
+            label, category = "sensitive", "adversarial"
+            if action == "allow":
+                action = "warn"
+        return {"event": "verdict", "action": action, "label": label, "category": category,
+                "hit_types": sorted(self.first_hit), "final": final}
+
+    def events(self, regions: List[Region]) -> List[Dict]:
+        out = []
+        for r in regions:
+            for h in r.hits:
+                self.first_hit.setdefault(h["type"], h)
+            self.adversarial = self.adversarial or (
+                self.policy.plan.wants("adversarial") and is_adversarial(self.tail + r.text))
+            self.tail = (self.tail + r.text)[-64:]
+            out.append({"event": "output", "offset": r.offset, "text": r.masked, "hits": r.hits})
+            v = self.verdict()
+            if self.last is None or any(v[k] != self.last[k] for k in ("action", "label", "category")):
+                out.append(v)
+                self.last = v
+        return out
+
+
+async def _run_bounded(fn, *args):
+    # CPU-bound work goes to the bounded executor; a full queue is answered right away
+    try:
+        return await _executor.run(fn, *args)
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"msg": "Server busy, retry later.", "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _embedding_batcher_stats() -> Optional[Dict]:
+    emb = getattr(_semantic_model(), "embedder", None)
+    return emb.stats() if isinstance(emb, MicroBatcher) else None
+
+
+# Endpoints
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process answers; the model may still be loading
+    sem = _semantic_model()
+    return {
+        "ok": True,
+        "version": app.version,
+        "semantic_enabled": bool(sem is not None),
+        "semantic": _semantic_loader.status(),
+        "prefilter": prefilter_stats() if DETECTOR_PREFILTER else None,
+        "pipeline": _pipeline.stats(),
+        "executor": _executor.stats(),
+        "policy": _policy.status(),
+        "embedding_batcher": _embedding_batcher_stats(),
+        "embedding_cache": sem.cache.stats() if sem and sem.cache else None,
+        "reference_bank": {"rows": len(sem.bank.texts), "from_cache": sem.bank.from_cache,
+                           "ann": sem.bank.index.info() if sem.bank.index is not None else None,
+                           "rules": sem.rules_status()}
+        if sem else None,
+    }
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus scrape target; 404 when METRICS_ENABLED=0
+    if _metrics is None:
+        raise HTTPException(status_code=404, detail={"msg": "Metrics disabled."})
+    return Response(content=_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: 503 until the semantic model has finished loading (or failed / is disabled)
+    ready = not _semantic_loader.pending
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "semantic": _semantic_loader.status()},
+    )
+
+
+@app.post("/moderate", response_model=ModerateOut)
+async def moderate(payload: ModerateIn, x_policy_profile: Optional[str] = Header(default=None)):
+    text = (payload.text or "").strip()
+    policy = _profile(payload.profile or x_policy_profile)
+
+    out = (await _run_bounded(_moderate, [text], policy, payload.debug_profile))[0]
+    if out["action"] == "block":
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "msg": out["msg"],
+                "enforcement": out["enforcement"],
+                "label": out["label"],
+                "category": out["category"],
+                "suggested_text": out["text"],
+                "hits": out["hits"],
+                "warnings": out["warnings"],
+                "stages": out["stages"],
+                "profile": out.get("profile"),
+            },
+        )
+    return out
+
+
+@app.post("/moderate/batch", response_model=ModerateBatchOut)
+async def moderate_batch(payload: ModerateBatchIn, x_policy_profile: Optional[str] = Header(default=None)):
+    if len(payload.texts) > MODERATE_BATCH_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail={"msg": f"Batch too large ({len(payload.texts)} > {MODERATE_BATCH_MAX})."},
+        )
+    texts = [(t or "").strip() for t in payload.texts]
+    policy = _profile(payload.profile or x_policy_profile)
+
+    # one embedding pass for the texts that still need the semantic stage
+    return {"results": await _run_bounded(_moderate, texts, policy, payload.debug_profile)}
+
+
+@app.post("/admin/policy/reload")
+def reload_policy(x_admin_token: Optional[str] = Header(default=None)):
+    # Recompile the policy file now (workers also pick up file changes on their own)
+    if ADMIN_TOKEN is None or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail={"msg": "Admin token required."})
+    swapped, policy = _policy.reload()
+    if _policy.last_error:
+        raise HTTPException(status_code=400, detail={"msg": _policy.last_error, "active": policy.info()})
+    return {"reloaded": swapped, **policy.info()}
+
+
+@app.post("/admin/rules/reload")
+def reload_rules(x_admin_token: Optional[str] = Header(default=None)):
+    # Re-read rules.yaml now; only phrases not in the live bank are encoded
+    if ADMIN_TOKEN is None or x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail={"msg": "Admin token required."})
+    sem = _semantic_model()
+    if sem is None:
+        raise HTTPException(status_code=503, detail={"msg": "Semantic model not loaded.",
+                                                     "semantic": _semantic_loader.status()})
+    swapped = sem.reload_rules()
+    if sem.rules_last_error:
+        raise HTTPException(status_code=400, detail={"msg": sem.rules_last_error, "rules": sem.rules_status()})
+    return {"reloaded": swapped, "rows": len(sem.bank.texts), **sem.rules_status()}
+
+
+@app.websocket("/moderate/stream")
+async def moderate_stream(ws: WebSocket):
+    """
+    Moderate text as it arrives. The client sends `{"text": "..."}` messages
+    with consecutive fragments and `{"done": true}` at the end. The server
+    answers with `output` events (the original text of each region, masked,
+    once it is final), a `verdict` event whenever the running verdict
+    changes, and a last `verdict` with `final: true` before closing. The
+    policy profile comes from the X-Policy-Profile header or `?profile=`.
+    """
+    try:
+        policy = _policy.current().profile(ws.headers.get("x-policy-profile") or ws.query_params.get("profile"))
+    except KeyError:
+        await ws.close(code=1008, reason="unknown policy profile")  # 1008 = policy violation
+        return
+    await ws.accept()
+    scanner = StreamScanner(hold=STREAM_HOLD_CHARS, scanner=_scanner, prefilter=DETECTOR_PREFILTER,
+                            normalizer=_normalizer, detectors=policy.plan.detectors)
+    state = _StreamVerdict(policy)
+    try:
+        while True:
+            msg = await ws.receive_json()
+            if msg.get("done"):
+                break
+            regions = await _executor.run(scanner.feed, str(msg.get("text") or ""))
+            for ev in state.events(regions):
+                await ws.send_json(ev)
+        for ev in state.events(scanner.close()):
+            await ws.send_json(ev)
+        await ws.send_json(state.verdict(final=True))
+        await ws.close()
+    except Overloaded:
+        await ws.close(code=1013, reason="server busy, retry later")  # 1013 = try again later
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import os
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Prometheus text exposition format (0.0.4), written directly: a handful of
+# counters and histograms do not need the prometheus_client dependency.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS_S = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+SIZE_BUCKETS_CHARS = [64, 256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, n: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + n
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        out += [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in sorted(values.items())]
+        return out
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = list(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # per-bucket counts (+Inf last), then sum
+
+    def observe(self, value: float, *labels: str):
+        i = bisect_left(self.buckets, value)  # first bucket with value <= bound
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, s in sorted(series.items()):
+            cum = 0.0
+            for bound, n in zip(self.buckets + ["+Inf"], s[:-1]):
+                cum += n
+                le = 'le="%s"' % (bound if bound == "+Inf" else _num(bound))
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {_num(cum)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(s[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {_num(cum)}")
+        return out
+
+
+class Gauge:
+    """Value read at scrape time."""
+
+    def __init__(self, name: str, help: str, read: Callable[[], float], labelnames: Sequence[str] = (),
+                 labels: Sequence[str] = ()):
+        self.name, self.help, self.read = name, help, read
+        self.labelnames, self.labels = tuple(labelnames), tuple(labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge",
+                f"{self.name}{_labels(self.labelnames, self.labels)} {_num(self.read())}"]
+
+
+def rss_bytes() -> float:
+    # resident set size of this process (Linux /proc; 0 elsewhere)
+    try:
+        with open("/proc/self/statm") as f:
+            return float(int(f.read().split()[1]) * _PAGE_SIZE)
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+class ModerationMetrics:
+    """
+    Series exposed on /metrics. Each observation is a bisect and a few
+    additions under a lock; the stages time whole batches, not texts. In a
+    multi-worker setup each worker reports its own series (label `pid` on
+    the RSS gauge), so scrape every worker or aggregate by instance.
+    """
+
+    def __init__(self):
+        self.requests = Counter("moderation_results_total", "Moderated texts by verdict.",
+                                ("action", "label", "category"))
+        self.stage_seconds = Histogram("moderation_stage_seconds", "Wall time of one pipeline stage call.",
+                                       LATENCY_BUCKETS_S, ("stage",))
+        self.input_chars = Histogram("moderation_input_chars", "Length of moderated texts.", SIZE_BUCKETS_CHARS)
+        self.rss = Gauge("process_resident_memory_bytes", "Resident set size of this worker.", rss_bytes,
+                         ("pid",), (str(os.getpid()),))
+        self._all = [self.requests, self.stage_seconds, self.input_chars, self.rss]
+
+    def after_fork(self):
+        self.rss.labels = (str(os.getpid()),)
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_seconds.observe(seconds, stage)
+
+    def observe_result(self, text: str, res: Dict):
+        self.input_chars.observe(len(text))
+        self.requests.inc(res["action"], res["label"], res["category"])
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._all:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class ModerationContext:
+    """
+    State of one text while it moves through the moderation stages.
+    """
+    text: str
+    hits: List[Dict] = field(default_factory=list)
+    cls: Dict[str, str] = field(default_factory=dict)   # label/category from regex hits
+    policy: Any = None                                   # CompiledPolicy the verdict was resolved with
+    action: str = "allow"                                # policy action from regex hits
+    policy_warnings: List[str] = field(default_factory=list)
+    adversarial: bool = False
+    address_like: bool = False
+    sem_res: Any = None
+    scan_warning: Optional[str] = None                   # detector scan was cut short (length / budget)
+    unscanned: bool = False                              # ... and the fallback policy is to block
+    scan_profile: Any = None                             # ScanProfile when detector profiling is on
+    stages: List[str] = field(default_factory=list)      # stages that ran, in order
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    cost: float                                          # relative cost per text (regex = 1)
+    run: Callable[[List[ModerationContext]], None]       # processes every context that needs it
+    needed: Optional[Callable[[ModerationContext], bool]] = None  # None = always runs
+
+
+class StagedPipeline:
+    """
+    Runs stages in order over a batch of contexts. A stage only sees the
+    contexts whose verdict it can still change (`needed`), so expensive
+    stages are skipped per text and run once for the rest of the batch.
+    """
+
+    def __init__(self, stages: List[Stage], observe: Optional[Callable[[str, float], None]] = None):
+        self.stages = list(stages)
+        self.observe = observe  # (stage name, seconds) per stage call, e.g. metrics; None = untimed
+        self._lock = threading.Lock()
+        self._runs = {s.name: 0 for s in self.stages}
+        self._skips = {s.name: 0 for s in self.stages}
+
+    def run(self, ctxs: List[ModerationContext]) -> List[ModerationContext]:
+        for stage in self.stages:
+            todo = ctxs if stage.needed is None else [c for c in ctxs if stage.needed(c)]
+            if todo:
+                if self.observe is None:
+                    stage.run(todo)
+                else:
+                    t0 = time.perf_counter()
+                    stage.run(todo)
+                    self.observe(stage.name, time.perf_counter() - t0)
+                for c in todo:
+                    c.stages.append(stage.name)
+            with self._lock:
+                self._runs[stage.name] += len(todo)
+                self._skips[stage.name] += len(ctxs) - len(todo)
+        return ctxs
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                s.name: {
+                    "cost": s.cost,
+                    "runs": self._runs[s.name],
+                    "skipped": self._skips[s.name],
+                    "cost_saved": self._skips[s.name] * s.cost,
+                }
+                for s in self.stages
+            }
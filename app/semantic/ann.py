@@ -0,0 +1,234 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.semantic.bank import ReferenceBank
+
+ANN_KINDS = ("off", "ivf", "hnsw")
+ANN_FORMAT_VERSION = 1
+_CALIBRATION_QUERIES = 256
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(x, axis=1, keepdims=True)
+    return (x / np.where(n > 0, n, 1.0)).astype(np.float32)
+
+
+def _calibration_queries(matrix: np.ndarray, seed: int) -> np.ndarray:
+    # queries that sit between two reference phrases, so the nearest rows are not trivially themselves
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, len(matrix), _CALIBRATION_QUERIES)
+    b = rng.integers(0, len(matrix), _CALIBRATION_QUERIES)
+    return _normalize(matrix[a] + 0.5 * matrix[b])
+
+
+def _recall(S: np.ndarray, exact: np.ndarray, k: int) -> float:
+    # share of the exact top-k rows that the approximate scores also rank in their top k
+    got = np.argpartition(-S, k - 1, axis=1)[:, :k]
+    want = np.argpartition(-exact, k - 1, axis=1)[:, :k]
+    return float(np.mean([len(np.intersect1d(g, w)) / k for g, w in zip(got, want)]))
+
+
+def _index_path(cache_dir: Path, kind: str, key: str, recall: float, k: int, ext: str) -> Path:
+    return Path(cache_dir) / f"ann-{kind}-v{ANN_FORMAT_VERSION}-{key[:24]}-r{recall:g}-k{k}.{ext}"
+
+
+class IVFIndex:
+    """
+    Inverted-file index over the bank rows: rows are clustered (spherical
+    k-means) and a query is scored exactly against the rows of its
+    `nprobe` closest clusters only. Rows of the other clusters score -inf.
+    `nprobe` is the smallest value that reaches the target recall@k on
+    calibration queries.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, matrix: np.ndarray, centroids: np.ndarray, assign: np.ndarray, nprobe: int):
+        self.rows = len(matrix)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.assign = assign.astype(np.int64)
+        self.perm = np.argsort(self.assign, kind="stable")
+        counts = np.bincount(self.assign, minlength=len(self.centroids))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.blocks = np.ascontiguousarray(matrix[self.perm], dtype=np.float32)  # rows grouped by cluster
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, recall: float, k: int, seed: int = 0, iters: int = 10) -> "IVFIndex":
+        rows = len(matrix)
+        nlist = max(1, int(np.sqrt(rows)))
+        rng = np.random.default_rng(seed)
+        centroids = matrix[rng.choice(rows, nlist, replace=False)].astype(np.float32)
+        sample = matrix[rng.choice(rows, min(rows, 64 * nlist), replace=False)]
+        for _ in range(iters):
+            a = (sample @ centroids.T).argmax(axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, a, sample)
+            empty = ~np.bincount(a, minlength=nlist).astype(bool)
+            sums[empty] = centroids[empty]  # keep clusters that lost all their rows
+            centroids = _normalize(sums)
+        assign = np.concatenate([(matrix[i:i + 4096] @ centroids.T).argmax(axis=1)
+                                 for i in range(0, rows, 4096)])
+        index = cls(matrix, centroids, assign, nlist)
+        index.calibrate(matrix, recall, k, seed)
+        return index
+
+    def calibrate(self, matrix: np.ndarray, recall: float, k: int, seed: int = 0):
+        Q = _calibration_queries(matrix, seed)
+        exact = Q @ matrix.T
+        nlist, nprobe = len(self.centroids), 1
+        while nprobe < nlist:
+            self.nprobe = nprobe
+            if _recall(self.similarities(Q), exact, k) >= recall:
+                return
+            nprobe *= 2
+        self.nprobe = nlist
+
+    def similarities(self, Q: np.ndarray) -> np.ndarray:
+        Q = np.asarray(Q, dtype=np.float32)
+        S = np.full((len(Q), self.rows), -np.inf, dtype=np.float32)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(Q @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        probed = np.zeros((len(Q), len(self.centroids)), dtype=bool)
+        probed[np.arange(len(Q))[:, None], probe] = True
+        for c in np.flatnonzero(probed.any(axis=0)):
+            s, e = self.offsets[c], self.offsets[c + 1]
+            if s == e:
+                continue
+            qs = np.flatnonzero(probed[:, c])
+            S[np.ix_(qs, self.perm[s:e])] = Q[qs] @ self.blocks[s:e].T
+        return S
+
+    def save(self, path: Path):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, assign=self.assign, nprobe=np.array(self.nprobe))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray) -> Optional["IVFIndex"]:
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                centroids, assign, nprobe = f["centroids"], f["assign"], int(f["nprobe"])
+        except (OSError, KeyError, ValueError):
+            return None
+        if len(assign) != len(matrix) or centroids.shape[1:] != matrix.shape[1:]:
+            return None
+        return cls(matrix, centroids, assign, nprobe)
+
+    def info(self):
+        return {"kind": self.kind, "lists": len(self.centroids), "nprobe": self.nprobe}
+
+
+class HNSWIndex:
+    """
+    hnswlib graph over the bank rows (inner product). A query is scored
+    exactly against its `candidates` approximate nearest rows; the other rows
+    score -inf. `candidates` (and the search `ef`) is calibrated like IVF's
+    `nprobe`. Needs `pip install hnswlib`.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, matrix: np.ndarray, graph, candidates: int):
+        self.rows = len(matrix)
+        self.matrix = matrix
+        self.graph = graph
+        self.candidates = candidates
+        graph.set_ef(max(candidates, 16))
+
+    @staticmethod
+    def _new_graph(dim: int, rows: int):
+        import hnswlib  # optional dependency
+        graph = hnswlib.Index(space="ip", dim=dim)
+        graph.init_index(max_elements=max(rows, 1), ef_construction=200, M=16)
+        return graph
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, recall: float, k: int, seed: int = 0) -> "HNSWIndex":
+        graph = cls._new_graph(matrix.shape[1], len(matrix))
+        graph.add_items(np.asarray(matrix, dtype=np.float32), np.arange(len(matrix)))
+        index = cls(matrix, graph, len(matrix))
+        index.calibrate(matrix, recall, k, seed)
+        return index
+
+    def calibrate(self, matrix: np.ndarray, recall: float, k: int, seed: int = 0):
+        Q = _calibration_queries(matrix, seed)
+        exact = Q @ matrix.T
+        candidates = k
+        while candidates < self.rows:
+            self.candidates = candidates
+            self.graph.set_ef(max(candidates, 16))
+            if _recall(self.similarities(Q), exact, k) >= recall:
+                return
+            candidates *= 2
+        self.candidates = self.rows
+        self.graph.set_ef(max(self.rows, 16))
+
+    def similarities(self, Q: np.ndarray) -> np.ndarray:
+        Q = np.asarray(Q, dtype=np.float32)
+        S = np.full((len(Q), self.rows), -np.inf, dtype=np.float32)
+        labels, dist = self.graph.knn_query(Q, k=min(self.candidates, self.rows))
+        S[np.arange(len(Q))[:, None], labels.astype(np.int64)] = 1.0 - dist  # ip distance = 1 - dot
+        return S
+
+    def save(self, path: Path):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self.graph.save_index(str(tmp))
+        os.replace(tmp, path)
+        np.save(path.with_suffix(".npy"), np.array([self.candidates]))
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray) -> Optional["HNSWIndex"]:
+        try:
+            candidates = int(np.load(path.with_suffix(".npy"))[0])
+            graph = cls._new_graph(matrix.shape[1], len(matrix))
+            graph.load_index(str(path), max_elements=len(matrix))
+        except (OSError, ValueError, RuntimeError, IndexError):
+            return None
+        if graph.get_current_count() != len(matrix):
+            return None
+        return cls(matrix, graph, candidates)
+
+    def info(self):
+        return {"kind": self.kind, "candidates": self.candidates}
+
+
+_INDEXES = {"ivf": (IVFIndex, "npz"), "hnsw": (HNSWIndex, "bin")}
+
+
+def attach_index(bank: ReferenceBank, kind: str = "off", recall: float = 0.95, k: int = 10,
+                 min_rows: int = 4096, cache_dir: Optional[str] = None) -> ReferenceBank:
+    """
+    Give `bank` an ANN index (`bank.index`) when it has at least `min_rows`
+    rows. The index is loaded from, or saved to, `cache_dir` next to the
+    bank cache, keyed by the bank key and the recall settings. hnsw falls
+    back to ivf when hnswlib is not installed.
+    """
+    if kind not in ANN_KINDS:
+        raise ValueError(f"unknown ANN index {kind!r} (expected one of {ANN_KINDS})")
+    if kind == "off" or len(bank.texts) < max(min_rows, k + 1):
+        return bank
+    if kind == "hnsw":
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            print("[warn] hnswlib not installed; using the ivf index")
+            kind = "ivf"
+    cls, ext = _INDEXES[kind]
+    path = _index_path(cache_dir, kind, bank.key, recall, k, ext) if cache_dir and bank.key else None
+    index = cls.load(path, bank.matrix) if path is not None else None
+    if index is None:
+        index = cls.build(np.asarray(bank.matrix, dtype=np.float32), recall, k)
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                index.save(path)
+            except OSError as e:
+                print(f"[warn] could not write ANN index cache: {e}")
+    bank.index = index
+    return bank
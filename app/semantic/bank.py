@@ -0,0 +1,210 @@
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBED_DIM = 384
+BANK_FORMAT_VERSION = 1
+
+
+def bank_key(model_name: str, revision: Optional[str], rules_text: str, backend: str = "torch") -> str:
+    """
+    Identity of an encoded bank: anything that changes the embeddings changes the key.
+    """
+    h = hashlib.sha256()
+    for part in (f"v{BANK_FORMAT_VERSION}", model_name, revision or "", backend, rules_text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _bank_paths(cache_dir: Path, key: str) -> Tuple[Path, Path]:
+    stem = f"bank-v{BANK_FORMAT_VERSION}-{key[:24]}"
+    return cache_dir / f"{stem}.npy", cache_dir / f"{stem}.npz"
+
+
+@dataclass
+class ReferenceBank:
+    """
+    All reference phrases of rules.yaml stacked into one contiguous matrix.
+
+    Rows are laid out category by category, positives then negatives;
+    `pos_bounds[c]` / `neg_bounds[c]` hold the [start, end) rows of category c.
+    """
+    categories: List[str]
+    texts: List[str]           # row -> phrase
+    matrix: np.ndarray         # (rows, dim) float32, L2-normalized
+    pos_bounds: np.ndarray     # (categories, 2) int
+    neg_bounds: np.ndarray     # (categories, 2) int
+    key: Optional[str] = None  # bank_key() this bank was built/loaded for
+    from_cache: bool = False   # matrix is a read-only memory map of the on-disk cache
+    index: Optional[object] = None  # ANN index (app.semantic.ann) used by `scores`; None = exact
+
+    @classmethod
+    def layout(cls, rules: Dict) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        categories, texts, pos_b, neg_b = [], [], [], []
+        for cat, spec in rules["categories"].items():
+            pos = list(spec.get("positives", []) or [])
+            neg = list(spec.get("negatives", []) or [])
+            categories.append(cat)
+            pos_b.append((len(texts), len(texts) + len(pos)))
+            texts.extend(pos)
+            neg_b.append((len(texts), len(texts) + len(neg)))
+            texts.extend(neg)
+        shape = (len(categories), 2)
+        return (categories, texts,
+                np.array(pos_b, dtype=np.int64).reshape(shape),
+                np.array(neg_b, dtype=np.int64).reshape(shape))
+
+    @classmethod
+    def build(cls, rules: Dict, encode: Callable[[List[str]], np.ndarray]) -> "ReferenceBank":
+        categories, texts, pos_b, neg_b = cls.layout(rules)
+        matrix = encode(texts) if texts else np.empty((0, EMBED_DIM))
+        return cls(categories, texts, np.ascontiguousarray(matrix, dtype=np.float32), pos_b, neg_b)
+
+    def rebuild(self, rules: Dict, encode: Callable[[List[str]], np.ndarray]) -> Tuple["ReferenceBank", Dict[str, int]]:
+        """
+        Bank for `rules`, reusing this bank's rows for phrases it already
+        has and encoding only the new ones. Returns the new bank (this one is
+        left untouched) and counts of reused / encoded / dropped phrases.
+        """
+        categories, texts, pos_b, neg_b = self.layout(rules)
+        old_row: Dict[str, int] = {}
+        for i, t in enumerate(self.texts):
+            old_row.setdefault(t, i)
+        added = list(dict.fromkeys(t for t in texts if t not in old_row))
+        fresh = np.asarray(encode(added), dtype=np.float32) if added else np.empty((0, self.dim), np.float32)
+        new_row = {t: j for j, t in enumerate(added)}
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        reuse = [(i, old_row[t]) for i, t in enumerate(texts) if t in old_row]
+        if reuse:
+            dst, src = np.array(reuse, dtype=np.int64).T
+            matrix[dst] = self.matrix[src]
+        enc = [(i, new_row[t]) for i, t in enumerate(texts) if t in new_row]
+        if enc:
+            dst, src = np.array(enc, dtype=np.int64).T
+            matrix[dst] = fresh[src]
+        kept = set(texts)
+        stats = {"reused": len(reuse), "encoded": len(added),
+                 "dropped": sum(1 for t in old_row if t not in kept)}
+        return ReferenceBank(categories, texts, matrix, pos_b, neg_b), stats
+
+    @classmethod
+    def load(cls, cache_dir: Path, key: str) -> Optional["ReferenceBank"]:
+        """
+        Map a bank saved by `save`; None if missing, stale or unreadable.
+        Workers mapping the same file share its pages.
+        """
+        npy, npz = _bank_paths(Path(cache_dir), key)
+        try:
+            with np.load(npz, allow_pickle=False) as meta:
+                if str(meta["key"]) != key:
+                    return None
+                categories = [str(c) for c in meta["categories"]]
+                texts = [str(t) for t in meta["texts"]]
+                pos_b, neg_b = meta["pos_bounds"], meta["neg_bounds"]
+            matrix = np.load(npy, mmap_mode="r")
+        except (OSError, KeyError, ValueError):
+            return None
+        if matrix.dtype != np.float32 or matrix.ndim != 2 or matrix.shape[0] != len(texts):
+            return None
+        return cls(categories, texts, matrix, pos_b, neg_b, key=key, from_cache=True)
+
+    def save(self, cache_dir: Path, key: str):
+        # matrix first, metadata last (it is the commit marker); both via atomic rename
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        npy, npz = _bank_paths(cache_dir, key)
+        tmp_npy = npy.with_name(f".{npy.name}.{os.getpid()}.tmp")
+        tmp_npz = npz.with_name(f".{npz.name}.{os.getpid()}.tmp")
+        with open(tmp_npy, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(tmp_npy, npy)
+        with open(tmp_npz, "wb") as f:
+            np.savez(
+                f,
+                key=np.array(key),
+                categories=np.array(self.categories, dtype=str),
+                texts=np.array(self.texts, dtype=str),
+                pos_bounds=self.pos_bounds,
+                neg_bounds=self.neg_bounds,
+            )
+        os.replace(tmp_npz, npz)
+
+    @classmethod
+    def load_or_build(cls, rules: Dict, encode: Callable[[List[str]], np.ndarray],
+                      cache_dir: Optional[Path], key: str) -> "ReferenceBank":
+        if cache_dir:
+            bank = cls.load(cache_dir, key)
+            if bank is not None:
+                return bank
+        bank = cls.build(rules, encode)
+        bank.key = key
+        if cache_dir:
+            try:
+                bank.save(cache_dir, key)
+            except OSError as e:
+                print(f"[warn] could not write reference bank cache: {e}")
+        return bank
+
+    def share(self) -> "ReferenceBank":
+        """
+        Same bank with the matrix in an anonymous shared mapping, so processes
+        forked afterwards read the very same pages. A bank mapped from the
+        disk cache is already shared through the page cache.
+        """
+        if self.from_cache or self.matrix.size == 0:
+            return self
+        buf = mmap.mmap(-1, self.matrix.nbytes)
+        matrix = np.frombuffer(buf, dtype=np.float32).reshape(self.matrix.shape)
+        matrix[:] = self.matrix
+        matrix.flags.writeable = False
+        return replace(self, matrix=matrix)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.ndim == 2 else EMBED_DIM
+
+    def similarities(self, Q: np.ndarray) -> np.ndarray:
+        # one matmul for every category: (n, dim) @ (dim, rows) -> (n, rows)
+        return np.asarray(Q, dtype=np.float32) @ self.matrix.T
+
+    def scores(self, Q: np.ndarray) -> np.ndarray:
+        """Like `similarities`, through the ANN index if any: rows it did not score are -inf."""
+        return self.similarities(Q) if self.index is None else self.index.similarities(Q)
+
+    def segment_max(self, S: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-category max over positive and negative rows of S (n, rows).
+        Empty segments, and segments with no scored row (-inf), score 0.0.
+        """
+        n, C = S.shape[0], len(self.categories)
+        pos_max = np.zeros((n, C), dtype=np.float32)
+        neg_max = np.zeros((n, C), dtype=np.float32)
+        bounds = np.stack([self.pos_bounds, self.neg_bounds], axis=1).reshape(-1, 2)  # row order
+        nonempty = bounds[:, 1] > bounds[:, 0]
+        if n and nonempty.any():
+            # segments are consecutive, so reduceat over non-empty starts ends each at its own end
+            red = np.maximum.reduceat(S, bounds[nonempty, 0], axis=1)
+            flat = np.zeros((n, 2 * C), dtype=np.float32)
+            flat[:, nonempty] = np.where(red == -np.inf, 0.0, red)
+            pos_max, neg_max = flat[:, 0::2], flat[:, 1::2]
+        return pos_max, neg_max
+
+    def top_k(self, sims_row: np.ndarray, bounds: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        start, end = int(bounds[0]), int(bounds[1])
+        seg = sims_row[start:end]
+        if seg.size == 0 or k <= 0:
+            return []
+        if seg.size > k:
+            idx = np.argpartition(-seg, k - 1)[:k]
+            idx = idx[np.argsort(-seg[idx], kind="stable")]
+        else:
+            idx = np.argsort(-seg, kind="stable")
+        idx = idx[seg[idx] > -np.inf]  # rows the ANN index skipped
+        return [(self.texts[start + i], float(seg[i])) for i in idx]
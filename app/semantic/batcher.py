@@ -0,0 +1,140 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Upper bounds of the batch-size / queue-wait histograms (last bucket is +Inf)
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+WAIT_MS_BUCKETS = [0.5, 1, 2, 5, 10, 25, 50, 100]
+
+
+def _bucket(bounds: List[float], value: float) -> str:
+    for b in bounds:
+        if value <= b:
+            return str(b)
+    return "+Inf"
+
+
+class _Pending:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Embedder wrapper that coalesces concurrent `encode` calls.
+
+    The first queued request opens a window of `window_ms`; everything that
+    arrives before it closes (or until `max_batch` texts are collected) is
+    encoded in one call on a worker thread, and each caller gets its own rows.
+    """
+
+    def __init__(self, embedder, window_ms: float = 3.0, max_batch: int = 32):
+        self.embedder = embedder
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch = max(max_batch, 1)
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "batches": 0, "requests": 0, "texts": 0,
+            "batch_size_max": 0, "wait_ms_sum": 0.0, "wait_ms_max": 0.0, "encode_ms_sum": 0.0,
+        }
+        self._size_hist: Dict[str, int] = {}
+        self._wait_hist: Dict[str, int] = {}
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts):
+        if not texts:
+            return np.empty((0, 384))
+        item = _Pending(list(texts))
+        self._queue.put(item)
+        return item.future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, n, stop = [first], len(first.texts), False
+            deadline = first.enqueued + self.window
+            while n < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                n += len(item.texts)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        texts = [t for p in batch for t in p.texts]
+        try:
+            embs = self.embedder.encode(texts)
+        except Exception as e:
+            for p in batch:
+                p.future.set_exception(e)
+            return
+        encode_ms = (time.perf_counter() - started) * 1000.0
+
+        off = 0
+        for p in batch:
+            p.future.set_result(embs[off:off + len(p.texts)])
+            off += len(p.texts)
+
+        waits = [(started - p.enqueued) * 1000.0 for p in batch]
+        with self._lock:
+            st = self._stats
+            st["batches"] += 1
+            st["requests"] += len(batch)
+            st["texts"] += len(texts)
+            st["batch_size_max"] = max(st["batch_size_max"], len(texts))
+            st["wait_ms_sum"] += sum(waits)
+            st["wait_ms_max"] = max(st["wait_ms_max"], max(waits))
+            st["encode_ms_sum"] += encode_ms
+            key = _bucket(BATCH_SIZE_BUCKETS, len(texts))
+            self._size_hist[key] = self._size_hist.get(key, 0) + 1
+            for w in waits:
+                key = _bucket(WAIT_MS_BUCKETS, w)
+                self._wait_hist[key] = self._wait_hist.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            st = dict(self._stats)
+            size_hist = dict(self._size_hist)
+            wait_hist = dict(self._wait_hist)
+        batches, requests = st["batches"] or 1, st["requests"] or 1
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "queue_depth": self._queue.qsize(),
+            "batches": int(st["batches"]),
+            "requests": int(st["requests"]),
+            "texts": int(st["texts"]),
+            "batch_size_avg": round(st["texts"] / batches, 2),
+            "batch_size_max": int(st["batch_size_max"]),
+            "wait_ms_avg": round(st["wait_ms_sum"] / requests, 3),
+            "wait_ms_max": round(st["wait_ms_max"], 3),
+            "encode_ms_avg": round(st["encode_ms_sum"] / batches, 3),
+            "batch_size_hist": size_hist,
+            "wait_ms_hist": wait_hist,
+        }
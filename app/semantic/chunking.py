@@ -0,0 +1,66 @@
+from __future__ import annotations
+import re
+from typing import List, Tuple
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; ~1000 chars of English stays below that
+DEFAULT_CHUNK_CHARS = 1000
+DEFAULT_MAX_CHUNKS = 16
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+def _sentences(text: str) -> List[Tuple[int, int]]:
+    spans, start = [], 0
+    for m in _SENTENCE_BREAK.finditer(text):
+        if m.start() > start:
+            spans.append((start, m.start()))
+        start = m.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def chunk_spans(text: str, max_chars: int = DEFAULT_CHUNK_CHARS,
+                max_chunks: int = DEFAULT_MAX_CHUNKS) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Split `text` into chunks of whole sentences of at most `max_chars`
+    (longer sentences are cut into windows at whitespace).
+
+    Returns (spans, total): when there are more than `max_chunks` chunks,
+    `max_chunks` of them are kept, evenly spread over the document
+    (first and last included), and `total` is the count before the cap.
+    """
+    max_chars = max(max_chars, 1)
+    chunks: List[Tuple[int, int]] = []
+    cur = None
+    for s, e in _sentences(text):
+        while e - s > max_chars:
+            if cur is not None:
+                chunks.append(cur)
+                cur = None
+            cut = text.rfind(" ", s + 1, s + max_chars + 1)
+            if cut <= s:
+                cut = s + max_chars
+            chunks.append((s, cut))
+            s = cut
+            while s < e and text[s].isspace():
+                s += 1
+        if s >= e:
+            continue
+        if cur is None:
+            cur = (s, e)
+        elif e - cur[0] <= max_chars:
+            cur = (cur[0], e)
+        else:
+            chunks.append(cur)
+            cur = (s, e)
+    if cur is not None:
+        chunks.append(cur)
+
+    total = len(chunks)
+    if max_chunks > 0 and total > max_chunks:
+        if max_chunks == 1:
+            return chunks[:1], total
+        step = (total - 1) / (max_chunks - 1)
+        chunks = [chunks[round(i * step)] for i in range(max_chunks)]
+    return chunks, total
@@ -1,10 +1,19 @@
 from __future__ import annotations
+import os
+import pathlib
+import threading
+import time
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import Collection, List, Optional, Tuple, Dict
 import numpy as np
 
+from app.semantic.ann import attach_index
+from app.semantic.bank import ReferenceBank, bank_key
+from app.semantic.chunking import DEFAULT_CHUNK_CHARS, DEFAULT_MAX_CHUNKS, chunk_spans
+from app.semantic.embed_cache import EmbeddingCache, cache_key
 from app.semantic.models import LocalEmbedder
-from app.semantic.rules_loader import load_rules
+from app.semantic.rules_loader import RULES_PATH, load_rules_text
+import yaml
 
 @dataclass
 class SemanticResult:
@@ -13,56 +22,241 @@ class SemanticResult:
     score: float       # positive - alpha*negative (0-1 not normalized)
     pos_top: List[Tuple[str, float]]
     neg_top: List[Tuple[str, float]]
+    # long-document mode: the chunk that gave the score, and how many chunks were scored / found
+    chunk_index: Optional[int] = None
+    chunk_span: Optional[Tuple[int, int]] = None
+    chunks: int = 1
+    chunks_total: int = 1
+
+def _is_commit_hash(revision: Optional[str]) -> bool:
+    return bool(revision) and len(revision) == 40 and all(c in "0123456789abcdef" for c in revision)
+
 
 class SemanticClassifier:
-    def __init__(self, model_name: str, threshold: float = 0.45, alpha: float = 0.30, topk: int = 3):
-        self.embedder = LocalEmbedder(model_name)
-        self.rules = load_rules()
+    def __init__(self, model_name: str, threshold: float = 0.45, alpha: float = 0.30, topk: int = 3,
+                 embedder=None, cache: Optional[EmbeddingCache] = None, neighbors: bool = True,
+                 bank_cache_dir: Optional[str] = None, model_revision: Optional[str] = None,
+                 backend: str = "torch", onnx_file: Optional[str] = None,
+                 chunk_chars: int = DEFAULT_CHUNK_CHARS, max_chunks: int = DEFAULT_MAX_CHUNKS,
+                 rules_path: Optional[pathlib.Path] = None, ann: str = "off", ann_recall: float = 0.95,
+                 ann_k: int = 10, ann_min_rows: int = 4096):
+        t0 = time.perf_counter()
+        self.model_name = model_name
+        self.model_revision = model_revision
+        if embedder is None:
+            embedder = LocalEmbedder(model_name, revision=model_revision, backend=backend, onnx_file=onnx_file)
+        self.embedder = embedder
+        t1 = time.perf_counter()
+        self.cache = cache
+        self.rules_path = pathlib.Path(rules_path or RULES_PATH)
+        self.rules_mtime = self._rules_stat()
+        rules_text = load_rules_text(self.rules_path)
+        self.rules = yaml.safe_load(rules_text)
+        self.rules_text = rules_text
         self.threshold = threshold
         self.alpha = alpha
         self.topk = topk
+        self.neighbors = neighbors
+        self.chunk_chars = chunk_chars  # texts longer than this are scored per chunk; 0 = never
+        self.max_chunks = max_chunks
+
+        # Reference embeddings are reused from disk when model snapshot, backend and rules are
+        # unchanged. A branch/tag like "main" can move, so the key needs the resolved commit;
+        # without one the on-disk bank is not used at all.
+        self.backend_id = getattr(self.embedder, "backend_id", type(self.embedder).__name__)
+        resolved = getattr(self.embedder, "resolved_revision", None)
+        if resolved is None and not _is_commit_hash(model_revision):
+            if bank_cache_dir:
+                print("[warn] model revision not resolvable; reference bank disk cache disabled")
+            bank_cache_dir = None
+        revision = f"{model_revision or ''}@{resolved or ''}"
+        self._bank_revision = revision
+        self._bank_cache_dir = bank_cache_dir
+        key = bank_key(model_name, revision, rules_text, backend=self.backend_id)
+        self.ann = {"kind": ann, "recall": ann_recall, "k": ann_k, "min_rows": ann_min_rows}
+        bank = ReferenceBank.load_or_build(self.rules, self.embedder.encode, bank_cache_dir, key)
+        t2 = time.perf_counter()
+        self.bank = self._with_index(bank)
+        self.load_timings = {
+            "model_ms": round((t1 - t0) * 1000.0, 1),
+            "bank_ms": round((t2 - t1) * 1000.0, 1),
+            "ann_ms": round((time.perf_counter() - t2) * 1000.0, 1),
+        }
+        self._reload_lock = threading.Lock()
+        self._rules_checked = time.monotonic()
+        self.rules_reloads = 0
+        self.rules_last_error: Optional[str] = None
+        self.rules_last_reload: Dict[str, object] = {}
+
+    def _with_index(self, bank: ReferenceBank) -> ReferenceBank:
+        # large banks get an ANN index (SEMANTIC_ANN); it travels with the bank object, so swaps stay atomic
+        a = self.ann
+        return attach_index(bank, a["kind"], recall=a["recall"], k=a["k"], min_rows=a["min_rows"],
+                            cache_dir=self._bank_cache_dir)
+
+    def _rules_stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.rules_path).st_mtime
+        except OSError:
+            return None
+
+    def poll_rules(self, check_interval: float):
+        """
+        Reload rules.yaml if its mtime changed; checked at most every
+        `check_interval` seconds. A reload already running elsewhere is not
+        waited for.
+        """
+        if check_interval <= 0 or time.monotonic() - self._rules_checked < check_interval:
+            return
+        self._rules_checked = time.monotonic()
+        if self._rules_stat() != self.rules_mtime:
+            self.reload_rules(wait=False)
+
+    def reload_rules(self, wait: bool = True) -> bool:
+        """
+        Re-read rules.yaml and swap in a bank for it. Phrases already in the
+        live bank keep their rows; only added ones are encoded. The new bank
+        is built aside and replaces the old one in a single assignment, so a
+        classify_batch call (which reads `self.bank` once) sees either the old
+        or the new rules. Returns whether the bank changed; a file that does
+        not parse keeps the current rules and sets `rules_last_error`.
+        """
+        if not self._reload_lock.acquire(blocking=wait):
+            return False
+        try:
+            t0 = time.perf_counter()
+            self.rules_mtime = self._rules_stat()
+            try:
+                rules_text = load_rules_text(self.rules_path)
+                rules = yaml.safe_load(rules_text)
+                if not isinstance(rules, dict) or not isinstance(rules.get("categories"), dict):
+                    raise ValueError("rules must have a `categories` mapping")
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                self.rules_last_error = str(e)
+                print(f"[warn] rules reload failed, keeping the current bank: {e}")
+                return False
+            self.rules_last_error = None
+            if rules_text == self.rules_text:
+                return False
+
+            key = bank_key(self.model_name, self._bank_revision, rules_text, backend=self.backend_id)
+            bank = ReferenceBank.load(self._bank_cache_dir, key) if self._bank_cache_dir else None
+            if bank is not None:
+                stats = {"reused": len(bank.texts), "encoded": 0, "dropped": 0, "from_cache": True}
+            else:
+                bank, stats = self.bank.rebuild(rules, self.embedder.encode)
+                bank.key = key
+                if self._bank_cache_dir:
+                    try:
+                        bank.save(self._bank_cache_dir, key)
+                    except OSError as e:
+                        print(f"[warn] could not write reference bank cache: {e}")
+            bank = self._with_index(bank)
+            self.rules, self.rules_text = rules, rules_text
+            self.bank = bank
+            self.rules_reloads += 1
+            self.rules_last_reload = {**stats, "ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+            print(f"[info] rules reloaded: {self.rules_last_reload}")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def rules_status(self) -> Dict[str, object]:
+        return {"path": str(self.rules_path), "reloads": self.rules_reloads,
+                "last_reload": self.rules_last_reload, "last_error": self.rules_last_error}
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        if self.cache is None:
+            return self.embedder.encode(texts)
+
+        keys = [cache_key(self.model_name, t) for t in texts]
+        cached = self.cache.get_many(keys)
+        miss = [i for i, v in enumerate(cached) if v is None]
+        if not miss:
+            return np.stack(cached)
+
+        # one model call for all misses (duplicates in the batch encoded once)
+        uniq: Dict[bytes, int] = {}
+        for i in miss:
+            uniq.setdefault(keys[i], i)
+        fresh = self.embedder.encode([texts[i] for i in uniq.values()])
+        self.cache.put_many(list(uniq.keys()), fresh)
+        row = {k: fresh[j] for j, k in enumerate(uniq.keys())}
+        return np.stack([v if v is not None else row[keys[i]] for i, v in enumerate(cached)])
+
+    def classify(self, text: str, neighbors: Optional[bool] = None) -> SemanticResult:
+        return self.classify_batch([text], neighbors=neighbors)[0]
+
+    def _pieces(self, text: str) -> Tuple[List[Tuple[int, int]], int]:
+        if self.chunk_chars > 0 and len(text) > self.chunk_chars:
+            return chunk_spans(text, self.chunk_chars, self.max_chunks)
+        return [(0, len(text))], 1
+
+    def classify_batch(self, texts: List[str], neighbors: Optional[bool] = None,
+                       categories: Optional[Collection[str]] = None,
+                       timings: Optional[Dict[str, float]] = None) -> List[SemanticResult]:
+        """
+        Classify many texts with one encode call and one matmul against the
+        stacked reference bank. Nearest-phrase lists (pos_top/neg_top) are only
+        built when `neighbors` (default: self.neighbors) is set.
+
+        Texts longer than `chunk_chars` are split into sentence chunks (at most
+        `max_chunks`), encoded in the same batch; each category takes the max
+        over the chunks and the result names the chunk that gave the score.
+
+        `categories` restricts the result to those bank categories (None = all).
+        If `timings` is given, seconds spent embedding and scoring are added
+        to its "embed" and "score" entries.
+        """
+        want_neighbors = self.neighbors if neighbors is None else neighbors
+        ts = [(t or "").strip() for t in texts]
+        results = [SemanticResult("non_sensitive", "general", 0.0, [], []) for _ in ts]
+        rows = [i for i, t in enumerate(ts) if t]
+        bank = self.bank  # one consistent snapshot for the whole call
+        off = [] if categories is None else [j for j, c in enumerate(bank.categories) if c not in categories]
+        if not rows or len(off) == len(bank.categories):
+            return results
+
+        pieces: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        first, counts = [], []
+        for i in rows:
+            cs, total = self._pieces(ts[i])
+            first.append(len(pieces))
+            counts.append((len(cs), total))
+            spans.extend(cs)
+            pieces.extend(ts[i][a:b] for a, b in cs)
+
+        t0 = time.perf_counter()
+        Q = self._embed(pieces)  # (pieces, d), normalized (cosine=dot)
+        t1 = time.perf_counter()
+        S = bank.scores(Q)
+        pos_max, neg_max = bank.segment_max(S)
+        chunk_scores = pos_max - self.alpha * neg_max           # (pieces, categories)
+        if off:
+            chunk_scores[:, off] = -np.inf
+        scores = np.maximum.reduceat(chunk_scores, first, axis=0)  # max over each text's chunks
+        best = scores.argmax(axis=1)  # first max wins, as in the old per-category loop
 
-        self.ref: Dict[str, Dict[str, object]] = {}
-        for cat, spec in self.rules["categories"].items():
-            pos = spec.get("positives", []) or []
-            neg = spec.get("negatives", []) or []
-            self.ref[cat] = {
-                "pos_texts": pos,
-                "neg_texts": neg,
-                "pos_embeds": self.embedder.encode(pos) if pos else np.empty((0, 384)),
-                "neg_embeds": self.embedder.encode(neg) if neg else np.empty((0, 384)),
-            }
-
-    def _topk(self, sims: np.ndarray, texts: List[str], k: int):
-        if sims.size == 0:
-            return [], 0.0
-        idx = np.argsort(-sims)[:k]
-        return [(texts[i], float(sims[i])) for i in idx], float(np.max(sims))
-
-    def classify(self, text: str) -> SemanticResult:
-        t = (text or "").strip()
-        if not t:
-            return SemanticResult("non_sensitive", "general", 0.0, [], [])
-
-        q = self.embedder.encode([t])[0]  # normalized (cosine=dot)
-
-        best_cat, best_score = "general", 0.0
-        best_pos, best_neg = [], []
-
-        for cat, bank in self.ref.items():
-            posE = bank["pos_embeds"]; negE = bank["neg_embeds"]
-            pos_pairs, pos_max = ([], 0.0)
-            neg_pairs, neg_max = ([], 0.0)
-            if isinstance(posE, np.ndarray) and posE.size:
-                pos_pairs, pos_max = self._topk(posE @ q, bank["pos_texts"], self.topk)
-            if isinstance(negE, np.ndarray) and negE.size:
-                neg_pairs, neg_max = self._topk(negE @ q, bank["neg_texts"], self.topk)
-
-            score = pos_max - self.alpha * neg_max
-            if score > best_score:
-                best_score, best_cat = score, cat
-                best_pos, best_neg = pos_pairs, neg_pairs
-
-        if best_cat != "general" and best_score >= self.threshold:
-            return SemanticResult("sensitive", best_cat, best_score, best_pos, best_neg)
-        return SemanticResult("non_sensitive", "general", best_score, best_pos, best_neg)
\ No newline at end of file
+        for r, i in enumerate(rows):
+            c = int(best[r])
+            score = float(scores[r, c])
+            if score <= 0.0:
+                continue
+            n, total = counts[r]
+            k = first[r] + int(chunk_scores[first[r]:first[r] + n, c].argmax())
+            pos_pairs, neg_pairs = [], []
+            if want_neighbors:
+                pos_pairs = bank.top_k(S[k], bank.pos_bounds[c], self.topk)
+                neg_pairs = bank.top_k(S[k], bank.neg_bounds[c], self.topk)
+            chunk = {}
+            if total > 1:
+                chunk = dict(chunk_index=k - first[r], chunk_span=spans[k], chunks=n, chunks_total=total)
+            if score >= self.threshold:
+                results[i] = SemanticResult("sensitive", bank.categories[c], score, pos_pairs, neg_pairs, **chunk)
+            else:
+                results[i] = SemanticResult("non_sensitive", "general", score, pos_pairs, neg_pairs, **chunk)
+        if timings is not None:
+            timings["embed"] = timings.get("embed", 0.0) + (t1 - t0)
+            timings["score"] = timings.get("score", 0.0) + (time.perf_counter() - t1)
+        return results
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    # Whitespace-only normalization: WordPiece/BPE tokenizers see the same tokens
+    return " ".join((text or "").split())
+
+
+def cache_key(model_name: str, text: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.digest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of query embeddings, bounded by entry count and bytes.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max(max_entries, 0)
+        self.max_bytes = max(max_bytes, 0)
+        self._data: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for k in keys:
+                v = self._data.get(k)
+                if v is None:
+                    self.misses += 1
+                else:
+                    self._data.move_to_end(k)
+                    self.hits += 1
+                out.append(v)
+        return out
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        with self._lock:
+            for k, v in zip(keys, vectors):
+                if k in self._data:
+                    self._data.move_to_end(k)
+                    continue
+                v = np.array(v, copy=True)  # don't pin the whole batch matrix
+                v.setflags(write=False)
+                size = v.nbytes + len(k)
+                if size > self.max_bytes or self.max_entries == 0:
+                    continue
+                self._data[k] = v
+                self._bytes += size
+                while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                    old_k, old_v = self._data.popitem(last=False)
+                    self._bytes -= old_v.nbytes + len(old_k)
+                    self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
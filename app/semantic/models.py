@@ -2,11 +2,45 @@ from __future__ import annotations
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+# torch: full PyTorch model; onnx: exported fp32 graph; onnx-int8: dynamically quantized graph.
+# The ONNX backends need `onnxruntime` (pip install "sentence-transformers[onnx]").
+EMBED_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+
 class LocalEmbedder:
-    def __init__(self, model_name: str):
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str, revision: str | None = None,
+                 backend: str = "torch", onnx_file: str | None = None):
+        if backend not in EMBED_BACKENDS:
+            raise ValueError(f"unknown embedder backend {backend!r} (expected one of {EMBED_BACKENDS})")
+        self.model_name = model_name
+        self.revision = revision
+        self.backend = backend
+        if backend == "torch":
+            self.onnx_file = None
+            self.model = SentenceTransformer(model_name, revision=revision)
+        else:
+            # same tokenizer, pooling and normalization modules; only the transformer runs in ORT
+            self.onnx_file = onnx_file or (DEFAULT_INT8_FILE if backend == "onnx-int8" else None)
+            model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+            self.model = SentenceTransformer(model_name, revision=revision, backend="onnx",
+                                             model_kwargs=model_kwargs)
+
+    @property
+    def resolved_revision(self) -> str | None:
+        # commit hash of the hub snapshot actually loaded (None for local paths)
+        try:
+            return getattr(self.model[0].auto_model.config, "_commit_hash", None)
+        except (AttributeError, IndexError, TypeError):
+            return None
+
+    @property
+    def backend_id(self) -> str:
+        # part of the reference-bank cache key: different graphs give (slightly) different vectors
+        return f"{self.backend}:{self.onnx_file}" if self.onnx_file else self.backend
 
     def encode(self, texts):
         if not texts:
             return np.empty((0, 384))
-        return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
\ No newline at end of file
+        out = self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(out, dtype=np.float32)
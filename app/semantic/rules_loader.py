@@ -2,6 +2,10 @@ from __future__ import annotations
 import pathlib
 import yaml
 
-def load_rules():
-    p = pathlib.Path(__file__).with_name("rules.yaml")
-    return yaml.safe_load(p.read_text(encoding="utf-8"))
\ No newline at end of file
+RULES_PATH = pathlib.Path(__file__).with_name("rules.yaml")
+
+def load_rules_text(path: pathlib.Path | None = None) -> str:
+    return (path or RULES_PATH).read_text(encoding="utf-8")
+
+def load_rules(path: pathlib.Path | None = None):
+    return yaml.safe_load(load_rules_text(path))
@@ -1,19 +1,122 @@
-from typing import Tuple
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from app.semantic.batcher import MicroBatcher
 from app.semantic.classifier import SemanticClassifier, SemanticResult
+from app.semantic.embed_cache import EmbeddingCache
 
-def load_semantic_model(enabled: bool, model_name: str, threshold: float, alpha: float):
+def load_semantic_model(enabled: bool, model_name: str, threshold: float, alpha: float,
+                        batch_window_ms: float = 0.0, batch_max: int = 32,
+                        cache_entries: int = 0, cache_bytes: int = 0, neighbors: bool = True,
+                        bank_cache_dir: str | None = None, model_revision: str | None = None,
+                        backend: str = "torch", onnx_file: str | None = None,
+                        chunk_chars: int = 1000, max_chunks: int = 16,
+                        ann: str = "off", ann_recall: float = 0.95, ann_k: int = 10, ann_min_rows: int = 4096):
     # Load the semantic model safely, return None if it fails
     if not enabled:
         return None
+    cache = EmbeddingCache(cache_entries, cache_bytes) if cache_entries > 0 and cache_bytes > 0 else None
     try:
-        return SemanticClassifier(model_name=model_name, threshold=threshold, alpha=alpha)
+        clf = SemanticClassifier(model_name=model_name, threshold=threshold, alpha=alpha,
+                                 cache=cache, neighbors=neighbors,
+                                 bank_cache_dir=bank_cache_dir or None, model_revision=model_revision,
+                                 backend=backend, onnx_file=onnx_file,
+                                 chunk_chars=chunk_chars, max_chunks=max_chunks,
+                                 ann=ann, ann_recall=ann_recall, ann_k=ann_k, ann_min_rows=ann_min_rows)
     except Exception as e:
         print(f"[warn] semantic model load failed: {e}")
         return None
+    # Rule banks are encoded by now; only per-request queries go through the batcher
+    if batch_window_ms > 0:
+        clf.embedder = MicroBatcher(clf.embedder, window_ms=batch_window_ms, max_batch=batch_max)
+    return clf
+
+class SemanticLoader:
+    """
+    Loads the semantic classifier on a background thread so the app can serve
+    (regex + heuristics only) while the model and rule bank are still loading.
+
+    state: disabled | pending | ready | failed
+    """
+
+    def __init__(self, load: Callable[[], Optional[SemanticClassifier]], enabled: bool = True):
+        self._load = load
+        self._clf: Optional[SemanticClassifier] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "pending" if enabled else "disabled"
+        self.started: Optional[float] = None
+        self.load_ms: Optional[float] = None
+        if not enabled:
+            self._done.set()
+
+    def start(self, background: bool = True) -> "SemanticLoader":
+        if self.state != "pending" or self._thread is not None:
+            return self
+        self.started = time.perf_counter()
+        if background:
+            self._thread = threading.Thread(target=self._run, name="semantic-loader", daemon=True)
+            self._thread.start()
+        else:
+            self._run()
+        return self
+
+    def _run(self):
+        try:
+            clf = self._load()
+        except Exception as e:
+            print(f"[warn] semantic model load failed: {e}")
+            clf = None
+        self.load_ms = round((time.perf_counter() - self.started) * 1000.0, 1)
+        self._clf = clf
+        self.state = "ready" if clf is not None else "failed"
+        print(f"[info] semantic model {self.state} after {self.load_ms:.0f} ms")
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def get(self) -> Optional[SemanticClassifier]:
+        return self._clf
+
+    @property
+    def pending(self) -> bool:
+        return self.state == "pending"
+
+    def status(self) -> Dict[str, object]:
+        out: Dict[str, object] = {"state": self.state, "load_ms": self.load_ms}
+        if self.pending and self.started is not None:
+            out["elapsed_ms"] = round((time.perf_counter() - self.started) * 1000.0, 1)
+        if self._clf is not None:
+            out["backend"] = getattr(self._clf, "backend_id", None)
+            out.update(getattr(self._clf, "load_timings", {}))
+        return out
+
+
+def prepare_for_fork(clf: Optional[SemanticClassifier]):
+    # Parent side of a preforking server: reference bank into shared memory, no live threads
+    if clf is None:
+        return
+    clf.bank = clf.bank.share()
+    if isinstance(clf.embedder, MicroBatcher):
+        clf.embedder.close()
+
+
+def after_fork(clf: Optional[SemanticClassifier]):
+    # Worker side: threads do not survive fork, so each worker starts its own batcher
+    if clf is not None and isinstance(clf.embedder, MicroBatcher):
+        old = clf.embedder
+        clf.embedder = MicroBatcher(old.embedder, window_ms=old.window * 1000.0, max_batch=old.max_batch)
+
 
 def semantic_debug_info(res: SemanticResult | None) -> Tuple[str, str, float, list]:
     # Debug output and return default values
     if not res:
         return "non_sensitive", "general", 0.0, []
     sem_warn = [f"[SEM] cat={res.category} score={res.score:.2f} label={res.label}"]
+    if res.chunk_span is not None:
+        s, e = res.chunk_span
+        sem_warn[0] += (f" chunk={res.chunk_index + 1}/{res.chunks}"
+                        f"{'' if res.chunks == res.chunks_total else f' (of {res.chunks_total})'} span={s}-{e}")
     return res.label, res.category, res.score, sem_warn
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Preforking server: load the model and reference bank once, then fork workers.
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+
+`uvicorn --workers N` imports app.main in every worker, so each one loads its
+own model and rule bank. Here the parent imports it (blocking load), moves
+the bank into shared memory, freezes the GC so refcount/GC passes leave the
+inherited objects alone, and forks; workers share the model weights
+copy-on-write and the bank pages outright. Dead workers are restarted.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, args) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    import uvicorn
+    from app import main as app_main
+
+    app_main.init_worker()
+    config = uvicorn.Config(app_main.app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve app.main with N forked workers sharing one loaded model.")
+    ap.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    ap.add_argument("--backlog", type=int, default=2048)
+    ap.add_argument("--keep-alive", type=int, default=5)
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    # Everything is loaded before the first fork; no loader thread in the parent
+    os.environ["SEMANTIC_LOAD"] = "blocking"
+    t0 = time.perf_counter()
+    from app import main as app_main
+    app_main.prepare_workers()
+    print(f"[info] preloaded in {time.perf_counter() - t0:.1f}s; forking {args.workers} workers", flush=True)
+
+    sock = _bind(args.host, args.port, args.backlog)
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(sock, args)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(max(args.workers, 1)):
+        spawn()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if not stopping and started is not None:
+            code = os.waitstatus_to_exitcode(status)
+            print(f"[warn] worker {pid} exited ({code}); restarting", flush=True)
+            if time.monotonic() - started < 1.0:
+                time.sleep(1.0)  # don't spin on a worker that dies at startup
+            spawn()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.actions.masker import mask_all
+from app.detectors.patterns import detect_all
+
+# Longest match we hold back for (card numbers, IBANs, typical JWTs) plus the
+# widest validator context window (80 chars for JWT / API-word checks).
+DEFAULT_HOLD = 384
+# Already-emitted text kept on the left so \b, lookbehinds and keyword windows see it.
+DEFAULT_CONTEXT = 128
+# Rescan only after this many new characters have arrived past the hold window.
+DEFAULT_STEP = 64
+
+_WS_OR_TEXT = re.compile(r"[ \t]+|[^ \t]+")
+
+
+@dataclass
+class Region:
+    offset: int                # start of `text` in the original stream
+    text: str                  # original text, whitespace untouched
+    masked: str
+    hits: List[Dict] = field(default_factory=list)  # spans are original-stream offsets
+
+
+class StreamScanner:
+    """
+    Incremental `detect_all` over text that arrives in fragments.
+
+    Detection runs on the whitespace-normalized stream (as `detect_all`
+    does); every normalized character remembers its position in the
+    original text, so regions and masks are emitted on the original.
+
+    Everything except the last `hold` normalized characters is final once
+    scanned: a match that starts there is fully visible (it is shorter than
+    `hold`), so it is reported exactly as on the whole text. Matches
+    straddling the boundary keep the boundary at their start. The buffer
+    never exceeds `max_buffer` normalized characters (plus the spaces/tabs
+    collapsed into them); past that, a straddling match is cut and masked as
+    found so far.
+    """
+
+    def __init__(self, hold: int = DEFAULT_HOLD, context: int = DEFAULT_CONTEXT,
+                 step: int = DEFAULT_STEP, max_buffer: Optional[int] = None,
+                 scanner=None, prefilter: bool = True, normalizer=None, detectors=None):
+        self.hold = max(hold, 1)
+        self.context = max(context, 1)  # at least the last char, to continue whitespace runs
+        self.step = max(step, 1)
+        self.max_buffer = max(max_buffer or 4 * self.hold, self.hold + self.step)
+        self.scanner = scanner
+        self.prefilter = prefilter
+        self.normalizer = normalizer  # steps beyond whitespace; spans come back in window coordinates
+        self.detectors = detectors    # subset to run (policy profile plan); None = all
+        self._ctx = ""            # normalized tail of finalized text
+        self._buf = ""            # normalized text not yet final
+        self._raw = ""            # original text behind _buf
+        self._pos: List[int] = [] # _buf[i] starts at _raw[_pos[i]]
+        self._offset = 0          # original-stream offset of _raw[0]
+        self._scanned = 0         # len(_buf) at the last scan
+
+    @property
+    def buffered(self) -> int:
+        return len(self._ctx) + len(self._buf)
+
+    def feed(self, chunk: str) -> List[Region]:
+        out: List[Region] = []
+        # bounded pieces, so one huge fragment cannot grow the buffer
+        for i in range(0, len(chunk or ""), self.step):
+            self._append(chunk[i:i + self.step])
+            if len(self._buf) >= self.hold + self.step and len(self._buf) - self._scanned >= self.step:
+                region = self._advance(final=False)
+                if region is not None:
+                    out.append(region)
+        return out
+
+    def close(self) -> List[Region]:
+        region = self._advance(final=True) if self._raw else None
+        return [region] if region is not None else []
+
+    def _append(self, piece: str):
+        # same result as normalize_whitespace on the whole stream: a run of
+        # spaces/tabs (even one split across fragments) becomes one space
+        for m in _WS_OR_TEXT.finditer(piece):
+            raw_at = len(self._raw) + m.start()
+            if m.group()[0] in " \t":
+                if m.start() == 0 and (self._buf[-1:] or self._ctx[-1:]) == " ":
+                    continue  # continues the run that ended the previous piece
+                self._buf += " "
+                self._pos.append(raw_at)
+            else:
+                self._buf += m.group()
+                self._pos.extend(range(raw_at, raw_at + len(m.group())))
+        self._raw += piece
+
+    def _raw_end(self, e: int) -> int:
+        # original end of normalized span [.., e): a collapsed space covers its whole run
+        if e >= len(self._buf):
+            return len(self._raw)
+        if self._buf[e - 1] == " ":
+            return self._pos[e]
+        return self._pos[e - 1] + 1
+
+    def _advance(self, final: bool) -> Optional[Region]:
+        window = self._ctx + self._buf
+        lead = len(self._ctx)
+        hits = []
+        for h in detect_all(window, scanner=self.scanner, prefilter=self.prefilter,
+                            normalizer=self.normalizer, detectors=self.detectors):
+            s, e = h["span"][0] - lead, h["span"][1] - lead
+            if s >= 0:  # starts before the buffer -> handled by an earlier region
+                hits.append((s, e, h))
+
+        commit = len(self._buf) if final else len(self._buf) - self.hold
+        if not final:
+            for s, e, _ in hits:
+                if s < commit < e:
+                    commit = s
+                    break
+            if commit <= 0 and len(self._buf) >= self.max_buffer:
+                # give up waiting: take the straddling match as found so far
+                commit = max((e for s, e, _ in hits if s <= 0 < e), default=len(self._buf) - self.hold)
+        self._scanned = len(self._buf)
+        if commit <= 0:
+            return None
+
+        raw_commit = len(self._raw) if final else self._pos[commit]
+        text = self._raw[:raw_commit]
+        region_hits = []
+        for s, e, h in hits:
+            if e <= commit:
+                region_hits.append({**h, "span": (self._pos[s], self._raw_end(e))})
+        masked = mask_all(text, region_hits)
+        for h in region_hits:
+            h["span"] = (h["span"][0] + self._offset, h["span"][1] + self._offset)
+
+        region = Region(self._offset, text, masked, region_hits)
+        self._ctx = (self._ctx + self._buf[:commit])[-self.context:]
+        self._buf = self._buf[commit:]
+        self._pos = [p - raw_commit for p in self._pos[commit:]]
+        self._raw = self._raw[raw_commit:]
+        self._offset += raw_commit
+        self._scanned = len(self._buf)
+        return region
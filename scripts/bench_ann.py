@@ -0,0 +1,83 @@
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.semantic.ann import attach_index
+from app.semantic.bank import ReferenceBank
+
+
+def clustered_rules(categories: int, per_category: int):
+    return {"categories": {
+        f"cat{c}": {
+            "positives": [f"c{c} pos {i}" for i in range(per_category)],
+            "negatives": [f"c{c} neg {i}" for i in range(max(per_category // 4, 1))],
+        } for c in range(categories)
+    }}
+
+
+def clustered_encoder(rng, topics: int, dim=384, spread=0.6):
+    # mined phrases cluster around topics; random unit rows would have no structure to index
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+
+    def encode(texts):
+        x = centers[rng.integers(0, topics, len(texts))] + spread * rng.standard_normal((len(texts), dim))
+        x = x.astype(np.float32)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+    return encode
+
+
+def score(bank: ReferenceBank, Q: np.ndarray, alpha: float):
+    S = bank.scores(Q)
+    pos_max, neg_max = bank.segment_max(S)
+    scores = pos_max - alpha * neg_max
+    return scores.argmax(axis=1), scores.max(axis=1)
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Exact vs ANN reference-bank scoring: latency and agreement.")
+    ap.add_argument("--categories", type=int, default=8)
+    ap.add_argument("--bank-sizes", default="2000,10000,40000", help="Positives per category")
+    ap.add_argument("--kinds", default="ivf,hnsw")
+    ap.add_argument("--recall", type=float, default=0.95)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--batches", default="1,32")
+    ap.add_argument("--queries", type=int, default=256, help="For the agreement columns")
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>7} {'index':>6} {'build s':>8} {'batch':>6} {'exact ms':>9} {'ann ms':>8} "
+          f"{'same cat':>9} {'max |dscore|':>13}")
+    for per_cat in (int(x) for x in args.bank_sizes.split(",")):
+        encode = clustered_encoder(rng, topics=max(per_cat // 50, 8))
+        exact = ReferenceBank.build(clustered_rules(args.categories, per_cat), encode)
+        probe = encode([""] * args.queries)
+        want_cat, want_score = score(exact, probe, 0.3)
+        for kind in args.kinds.split(","):
+            t0 = time.perf_counter()
+            ann = attach_index(ReferenceBank(exact.categories, exact.texts, exact.matrix, exact.pos_bounds,
+                                             exact.neg_bounds), kind, recall=args.recall, k=args.k, min_rows=0)
+            build = time.perf_counter() - t0
+            got_cat, got_score = score(ann, probe, 0.3)
+            same = float(np.mean(got_cat == want_cat))
+            delta = float(np.max(np.abs(got_score - want_score)))
+            for n in (int(x) for x in args.batches.split(",")):
+                Q = probe[:n]
+                t_exact = timed(lambda: score(exact, Q, 0.3), args.repeat)
+                t_ann = timed(lambda: score(ann, Q, 0.3), args.repeat)
+                print(f"{len(exact.texts):>7} {ann.index.kind:>6} {build:>8.2f} {n:>6} {t_exact:>9.3f} "
+                      f"{t_ann:>8.3f} {same:>9.3f} {delta:>13.4f}")
+
+
+if __name__ == "__main__":
+    main()
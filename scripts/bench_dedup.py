@@ -0,0 +1,61 @@
+import argparse, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.detectors.patterns import dedup_hits
+
+
+def dedup_quadratic(hits):
+    # Previous implementation, kept here as the reference
+    deduped, used_spans = [], []
+    for h in sorted(hits, key=lambda x: (x["span"][0], -(x["span"][1] - x["span"][0]))):
+        s, e = h["span"]
+        if any(s < ue and e > us for (us, ue) in used_spans):
+            continue
+        used_spans.append((s, e))
+        deduped.append(h)
+    return deduped
+
+
+def overlapping_hits(n: int, seed: int = 0):
+    """~n hits, three overlapping candidates per entity (like email/phone/ipv4 on a log dump)."""
+    rng = random.Random(seed)
+    hits, pos = [], 0
+    while len(hits) < n:
+        length = rng.randint(8, 30)
+        for k in range(3):
+            s = pos + rng.randint(0, 3)
+            hits.append({"type": f"t{k}", "span": (s, s + rng.randint(4, length)), "value": ""})
+        pos += length + rng.randint(1, 5)
+    rng.shuffle(hits)
+    return hits
+
+
+def timed(fn, hits) -> float:
+    t0 = time.perf_counter()
+    fn(hits)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stress benchmark for hit deduplication.")
+    ap.add_argument("--sizes", default="1000,5000,10000,20000,50000")
+    ap.add_argument("--reference-max", type=int, default=20000,
+                    help="Largest size to also run the quadratic reference on")
+    args = ap.parse_args()
+
+    print(f"{'hits':>8} {'kept':>8} {'sorted sweep ms':>16} {'quadratic ms':>13}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        hits = overlapping_hits(n)
+        kept = dedup_hits(hits)
+        fast = timed(dedup_hits, hits) * 1e3
+        ref = "-"
+        if n <= args.reference_max:
+            assert dedup_quadratic(hits) == kept, "dedup output differs from reference"
+            ref = f"{timed(dedup_quadratic, hits) * 1e3:.1f}"
+        print(f"{n:>8} {len(kept):>8} {fast:>16.1f} {ref:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.semantic.classifier import SemanticClassifier
+
+SENTENCE = "The committee reviewed the quarterly figures and agreed on the next steps. "
+
+
+class CostModelEmbedder:
+    """CPU transformer cost model: per-call overhead + per-text cost, inputs truncated at 256 tokens."""
+
+    def __init__(self, call_ms: float, text_ms: float):
+        self.call_ms, self.text_ms = call_ms, text_ms
+
+    def encode(self, texts):
+        time.sleep((self.call_ms + self.text_ms * len(texts)) / 1000.0)
+        out = np.random.rand(len(texts), 384).astype(np.float32)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Long-document semantic scoring: per-chunk calls vs one batch.")
+    ap.add_argument("--lengths", default="1000,4000,16000,64000", help="Document sizes in chars")
+    ap.add_argument("--chunk-chars", type=int, default=1000)
+    ap.add_argument("--max-chunks", type=int, default=16)
+    ap.add_argument("--call-ms", type=float, default=6.0)
+    ap.add_argument("--text-ms", type=float, default=1.5)
+    ap.add_argument("--real", action="store_true", help="Use the real model instead of the cost model")
+    args = ap.parse_args()
+
+    if args.real:
+        clf = SemanticClassifier("sentence-transformers/all-MiniLM-L6-v2",
+                                 chunk_chars=args.chunk_chars, max_chunks=args.max_chunks)
+    else:
+        clf = SemanticClassifier("synthetic", embedder=CostModelEmbedder(args.call_ms, args.text_ms),
+                                 chunk_chars=args.chunk_chars, max_chunks=args.max_chunks)
+
+    print(f"{'chars':>7} {'chunks':>7} {'per-chunk ms':>13} {'batched ms':>11}")
+    for n in (int(x) for x in args.lengths.split(",")):
+        doc = (SENTENCE * (n // len(SENTENCE) + 1))[:n]
+        spans, total = clf._pieces(doc)
+        t0 = time.perf_counter()
+        for s, e in spans:  # one forward pass per chunk
+            clf.classify(doc[s:e])
+        seq = (time.perf_counter() - t0) * 1e3
+        t0 = time.perf_counter()
+        clf.classify(doc)
+        batched = (time.perf_counter() - t0) * 1e3
+        print(f"{n:>7} {len(spans):>3}/{total:<3} {seq:>13.1f} {batched:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
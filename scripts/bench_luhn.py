@@ -0,0 +1,74 @@
+import argparse, random, re, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.detectors import patterns
+from app.detectors.patterns import detect_all
+from app.detectors.scanner import CombinedScanner
+
+
+def luhn_ok_per_digit(s: str) -> bool:
+    # previous implementation: regex + int list per call, no sharing between card and phone
+    digits = [int(d) for d in re.sub(r"\D", "", s)]
+    if not (13 <= len(digits) <= 19):
+        return False
+    checksum, parity = 0, len(digits) % 2
+    for i, d in enumerate(digits):
+        if i % 2 == parity:
+            d *= 2
+            if d > 9:
+                d -= 9
+        checksum += d
+    return checksum % 10 == 0
+
+
+def invoice(rng: random.Random, lines: int) -> str:
+    # spreadsheet / invoice / log style: card-like and phone-like numbers on every line
+    out = []
+    for i in range(lines):
+        num = "".join(rng.choice("0123456789") for _ in range(16))
+        out.append(f"{i:06d};ACC {num[:4]} {num[4:8]} {num[8:12]} {num[12:]};+90 5{rng.randint(10, 99)} "
+                   f"{rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)};"
+                   f"{rng.randint(1000000000000, 9999999999999)};{rng.random() * 1e5:.2f}")
+    return "\n".join(out)
+
+
+def best_ms(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        patterns._luhn_digits.cache_clear()
+        t0 = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="detect_all on numeric-heavy text: per-digit Luhn vs batched.")
+    ap.add_argument("--lines", default="10,100,1000,5000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    scanner = CombinedScanner()
+    batched = patterns.luhn_ok
+    print(f"{'lines':>6} {'chars':>8} {'luhn cands':>10} {'engine':>10} {'per-digit ms':>13} {'batched ms':>11}")
+    for n in (int(x) for x in args.lines.split(",")):
+        text = invoice(rng, n)
+        digits = [patterns._NON_DIGIT.sub("", m.group()) for det in (patterns.DETECTORS_BY_NAME["credit_card"],
+                  patterns.DETECTORS_BY_NAME["phone"]) for m in det.regex.finditer(text)]
+        cands = sum(13 <= len(d) <= 19 for d in digits)
+        for label, sc in (("sequential", None), ("combined", scanner)):
+            fn = lambda t: detect_all(t, scanner=sc)
+            patterns.luhn_ok, patterns.LUHN_BATCH_MIN = luhn_ok_per_digit, 10 ** 9
+            old = best_ms(fn, text, args.repeat)
+            expected = fn(text)
+            patterns.luhn_ok, patterns.LUHN_BATCH_MIN = batched, 8
+            new = best_ms(fn, text, args.repeat)
+            assert fn(text) == expected
+            print(f"{n:>6} {len(text):>8} {cands:>10} {label:>10} {old:>13.2f} {new:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse, os, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SEMANTIC_ENABLED", "0")  # regex + heuristics path: the cheapest, so overhead shows most
+
+import app.main as main
+from app.metrics import ModerationMetrics
+from app.pipeline import StagedPipeline
+
+FRAGMENTS = [
+    "mail john.doe@example.com", "call +90 532 123 45 67", "card 4111 1111 1111 1111",
+    "please summarize the quarterly report", "meeting moved to Friday", "ip 10.0.0.1",
+]
+
+
+def once(texts):
+    policy = main._policy.current()
+    t0 = time.perf_counter()
+    for t in texts:
+        main._moderate([t], policy)
+    return (time.perf_counter() - t0) / len(texts) * 1e6
+
+
+def main_():
+    ap = argparse.ArgumentParser(description="Per-request cost of the /metrics instrumentation.")
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    texts = [" and ".join(rng.sample(FRAGMENTS, 2)) for _ in range(args.texts)]
+    stages = main._pipeline.stages
+
+    m = ModerationMetrics()
+    setups = {"off": (None, StagedPipeline(stages)), "on": (m, StagedPipeline(stages, observe=m.observe_stage))}
+    best = {k: float("inf") for k in setups}
+    for _ in range(args.repeat):  # interleaved, so clock and cache drift hit both alike
+        for k, (metrics, pipeline) in setups.items():
+            main._metrics, main._pipeline = metrics, pipeline
+            best[k] = min(best[k], once(texts))
+    off, on = best["off"], best["on"]
+    print(f"{'metrics':>8} {'us/text':>9}")
+    print(f"{'off':>8} {off:>9.1f}")
+    print(f"{'on':>8} {on:>9.1f}   (+{on - off:.1f} us, {100 * (on - off) / off:.1f}%)")
+
+
+if __name__ == "__main__":
+    main_()
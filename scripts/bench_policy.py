@@ -0,0 +1,67 @@
+import argparse, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import yaml
+
+from app.actions.policy import POLICY_PATH, CompiledPolicy
+
+TYPES = ["email", "phone", "ipv4", "dob", "mac", "imei", "passport", "pin", "qr_code", "vehicle_registration",
+         "national_insurance", "serial_number", "health"]
+
+
+def make_reference(data):
+    # previous implementation: decide_actions + _compute_label_category over the dicts
+    policy, cmap, order = data["actions"], data["categories"], data["priority"]
+
+    def cat(t):
+        return cmap[t] if t in cmap else cmap.get(t.split(".")[0])
+
+    def verdict(hits):
+        has = set()
+        for h in hits:
+            has.add(policy.get(h["type"]) or policy.get(h["type"].split(".")[0]) or "allow")
+        action = next((a for a in ("block", "mask", "warn") if a in has), "allow")
+        mapped = [(h["type"].split(".")[0], cat(h["type"]) or cat(h["type"].split(".")[0]), h) for h in hits]
+        for base, c, h in mapped:
+            if base == "api_key" or "stripe" in h["type"]:
+                return action, "api_key"
+        for p in order:
+            for base, c, h in mapped:
+                if c == p:
+                    return action, c
+        return action, "other"
+    return verdict
+
+
+def best_us(fn, hits, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(hits)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verdict resolution: dict/list policy vs compiled table.")
+    ap.add_argument("--hits", default="1,10,100,1000")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    reference = make_reference(yaml.safe_load(POLICY_PATH.read_text()))
+    compiled = CompiledPolicy.load(POLICY_PATH)
+    rng = random.Random(0)
+    print(f"{'hits':>6} {'dicts us':>10} {'compiled us':>12}")
+    for n in (int(x) for x in args.hits.split(",")):
+        # low-priority types only: the old priority scan walks the whole list for each
+        hits = [{"type": rng.choice(TYPES)} for _ in range(n)]
+        v = compiled.resolve(hits)
+        assert (v.action, v.category) == reference(hits)
+        print(f"{n:>6} {best_us(reference, hits, args.repeat):>10.1f} "
+              f"{best_us(compiled.resolve, hits, args.repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
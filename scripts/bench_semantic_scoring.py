@@ -0,0 +1,83 @@
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.semantic.bank import ReferenceBank
+
+
+def random_rules(categories: int, per_category: int):
+    return {"categories": {
+        f"cat{c}": {
+            "positives": [f"c{c} pos {i}" for i in range(per_category)],
+            "negatives": [f"c{c} neg {i}" for i in range(max(per_category // 4, 1))],
+        } for c in range(categories)
+    }}
+
+
+def unit_rows(rng, n, dim=384):
+    x = rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def per_category_loop(bank: ReferenceBank, Q: np.ndarray, alpha: float, k: int):
+    # Previous scoring: two products and a full argsort per category, per query
+    out = []
+    for q in Q:
+        best = (0.0, None)
+        for c in range(len(bank.categories)):
+            (ps, pe), (ns, ne) = bank.pos_bounds[c], bank.neg_bounds[c]
+            pos = bank.matrix[ps:pe] @ q
+            neg = bank.matrix[ns:ne] @ q
+            _ = np.argsort(-pos)[:k], np.argsort(-neg)[:k]
+            score = (pos.max() if pos.size else 0.0) - alpha * (neg.max() if neg.size else 0.0)
+            if score > best[0]:
+                best = (score, c)
+        out.append(best)
+    return out
+
+
+def stacked(bank: ReferenceBank, Q: np.ndarray, alpha: float, k: int, neighbors: bool):
+    S = bank.similarities(Q)
+    pos_max, neg_max = bank.segment_max(S)
+    scores = pos_max - alpha * neg_max
+    best = scores.argmax(axis=1)
+    if neighbors:
+        for r, c in enumerate(best):
+            bank.top_k(S[r], bank.pos_bounds[c], k)
+            bank.top_k(S[r], bank.neg_bounds[c], k)
+    return best
+
+
+def timed(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-category loop vs stacked reference-bank scoring.")
+    ap.add_argument("--categories", type=int, default=8)
+    ap.add_argument("--bank-sizes", default="20,200,2000", help="Positives per category")
+    ap.add_argument("--batches", default="1,32")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>7} {'batch':>6} {'loop ms':>9} {'stacked ms':>11} {'+neighbors ms':>14}")
+    for per_cat in (int(x) for x in args.bank_sizes.split(",")):
+        rules = random_rules(args.categories, per_cat)
+        bank = ReferenceBank.build(rules, lambda texts: unit_rows(rng, len(texts)))
+        for n in (int(x) for x in args.batches.split(",")):
+            Q = unit_rows(rng, n)
+            loop = timed(lambda: per_category_loop(bank, Q, 0.3, 3), args.repeat)
+            fast = timed(lambda: stacked(bank, Q, 0.3, 3, False), args.repeat)
+            dbg = timed(lambda: stacked(bank, Q, 0.3, 3, True), args.repeat)
+            print(f"{len(bank.texts):>7} {n:>6} {loop:>9.3f} {fast:>11.3f} {dbg:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse, os, signal, subprocess, sys, time, urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SETUPS = {
+    # current setup: every worker imports app.main and loads its own model + bank
+    "uvicorn": lambda n, port: [sys.executable, "-m", "uvicorn", "app.main:app",
+                                "--workers", str(n), "--port", str(port), "--log-level", "warning"],
+    # load once in the parent, fork workers
+    "preload": lambda n, port: [sys.executable, "-m", "app.serve",
+                                "--workers", str(n), "--port", str(port), "--log-level", "warning"],
+}
+
+
+def descendants(pid: int):
+    children = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(d))
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        for c in children.get(p, []):
+            out.append(c)
+            todo.append(c)
+    return out
+
+
+def memory_kb(pid: int):
+    # Rss counts shared pages in full; Pss splits them between sharers; USS = private pages only
+    vals = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                vals[parts[0][:-1]] = int(parts[1])
+    return vals.get("Rss", 0), vals.get("Pss", 0), vals.get("Private_Clean", 0) + vals.get("Private_Dirty", 0)
+
+
+def wait_ready(port: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=2) as r:
+                if r.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def measure(setup: str, workers: int, port: int, settle: float, timeout: float):
+    proc = subprocess.Popen(SETUPS[setup](workers, port), cwd=ROOT, start_new_session=True)
+    try:
+        if not wait_ready(port, timeout):
+            raise RuntimeError(f"{setup}: server not ready after {timeout}s")
+        # every worker has to finish its own import/load before memory is comparable
+        time.sleep(settle)
+        for _ in range(20 * workers):
+            urllib.request.urlopen(urllib.request.Request(
+                f"http://127.0.0.1:{port}/moderate", data=b'{"text": "my blood test results came back"}',
+                headers={"Content-Type": "application/json"}), timeout=30).read()
+        rows = []
+        for pid in [proc.pid] + descendants(proc.pid):
+            try:
+                rows.append((pid, *memory_kb(pid)))
+            except OSError:
+                pass
+        return rows
+    finally:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="RSS / PSS per worker: uvicorn --workers vs app.serve (preload + fork).")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--setups", default="uvicorn,preload")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--settle", type=float, default=5.0)
+    ap.add_argument("--timeout", type=float, default=300.0)
+    args = ap.parse_args()
+
+    print(f"{'setup':<9} {'procs':>5} {'RSS MB/proc':>12} {'PSS MB/proc':>12} {'USS MB/proc':>12} {'PSS MB total':>13}")
+    for setup in args.setups.split(","):
+        rows = measure(setup, args.workers, args.port, args.settle, args.timeout)
+        n = len(rows)
+        rss, pss, uss = (sum(r[i] for r in rows) / 1024.0 for i in (1, 2, 3))
+        print(f"{setup:<9} {n:>5} {rss / n:>12.0f} {pss / n:>12.0f} {uss / n:>12.0f} {pss:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
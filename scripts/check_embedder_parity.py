@@ -0,0 +1,58 @@
+import argparse, sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.semantic.bank import ReferenceBank
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.models import EMBED_BACKENDS, LocalEmbedder
+from app.semantic.rules_loader import load_rules
+
+# Minimum per-phrase cosine against torch; int8 weights move vectors a little
+DEFAULT_MIN_COS = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+
+def verdicts(clf: SemanticClassifier, texts):
+    return [(r.label, r.category) for r in clf.classify_batch(texts, neighbors=False)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare ONNX embedder backends against torch on the rules bank.")
+    ap.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    ap.add_argument("--revision", default=None)
+    ap.add_argument("--backends", default="onnx,onnx-int8")
+    ap.add_argument("--onnx-file", default=None, help="Override the ONNX file inside the model repo")
+    ap.add_argument("--min-cos", type=float, default=None, help="Fail below this per-phrase cosine")
+    args = ap.parse_args()
+
+    rules = load_rules()
+    _, texts, _, _ = ReferenceBank.layout(rules)
+    ref = LocalEmbedder(args.model, revision=args.revision, backend="torch")
+    ref_vecs = ref.encode(texts)
+    ref_clf = SemanticClassifier(args.model, embedder=ref, neighbors=False)
+    ref_verdicts = verdicts(ref_clf, texts)
+
+    failed = False
+    print(f"{'backend':<10} {'dim':>4} {'norm err':>9} {'min cos':>8} {'mean cos':>9} {'verdicts':>9}")
+    for backend in args.backends.split(","):
+        if backend not in EMBED_BACKENDS or backend == "torch":
+            sys.exit(f"not a candidate backend: {backend}")
+        emb = LocalEmbedder(args.model, revision=args.revision, backend=backend, onnx_file=args.onnx_file)
+        vecs = emb.encode(texts)
+        cos = np.sum(vecs * ref_vecs, axis=1)
+        norm_err = float(np.abs(np.linalg.norm(vecs, axis=1) - 1.0).max())
+        clf = SemanticClassifier(args.model, embedder=emb, neighbors=False)
+        same = sum(a == b for a, b in zip(verdicts(clf, texts), ref_verdicts))
+
+        min_cos = args.min_cos if args.min_cos is not None else DEFAULT_MIN_COS[backend]
+        ok = vecs.shape == ref_vecs.shape and norm_err < 1e-3 and cos.min() >= min_cos
+        failed |= not ok
+        print(f"{backend:<10} {vecs.shape[1]:>4} {norm_err:>9.2e} {cos.min():>8.5f} {cos.mean():>9.5f} "
+              f"{same:>4}/{len(texts):<4} {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
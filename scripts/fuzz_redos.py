@@ -0,0 +1,72 @@
+import argparse, random, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.detectors.patterns import DETECTORS, ScanBudget, ScanBudgetExceeded, detect_all, find_matches
+from app.detectors.scanner import CombinedScanner
+
+# Building blocks for backtracking-heavy inputs: long runs of a pattern's
+# repeated class that never reach the part it needs next (anchor, boundary,
+# terminator), with and without separators the quantifiers may skip.
+RUNS = [
+    "a", "A", "1", "a-", "a.", "a_", "1 ", "1-", "1 -", "12.", "1234.", "12 ", "a/", "ab+", "A1",
+    "2fa", "http://", "0x", "sk-", "E1", "SN1", "PIN ", "MRN-", "00:", "aA0/",
+]
+TAILS = ["", "!", " x.y", "@", "@a", ".a", "-", " ", "a" * 3]
+PREFIX = "token secret license employee serial device "  # satisfy keyword prefilters
+
+
+def pathological(rng: random.Random, size: int):
+    for run in RUNS:
+        body = run * (size // len(run))
+        yield f"{run!r}*", PREFIX + body + rng.choice(TAILS)
+    for _ in range(len(RUNS)):
+        pieces = rng.sample(RUNS, 3)
+        yield "+".join(pieces), PREFIX + "".join(rng.choice(pieces) for _ in range(size // 3))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Worst-case scan time per detector on pathological inputs.")
+    ap.add_argument("--sizes", default="1000,10000,50000", help="Input sizes in chars")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--budget-ms", type=float, default=50.0, help="Budget for the detect_all column")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    scanner = CombinedScanner()
+    for size in (int(x) for x in args.sizes.split(",")):
+        inputs = list(pathological(rng, size))
+        worst = {d.name: (0.0, "") for d in DETECTORS}
+        for label, text in inputs:
+            for det in DETECTORS:
+                t0 = time.perf_counter()
+                find_matches(det, text)
+                dt = (time.perf_counter() - t0) * 1e3
+                if dt > worst[det.name][0]:
+                    worst[det.name] = (dt, label)
+        full = {(e, b): 0.0 for e in ("sequential", "combined") for b in (False, True)}
+        cut = 0
+        for _, text in inputs:
+            for engine, sc in (("sequential", None), ("combined", scanner)):
+                for budgeted in (False, True):
+                    t0 = time.perf_counter()
+                    try:
+                        detect_all(text, scanner=sc, budget=ScanBudget(args.budget_ms) if budgeted else None)
+                    except ScanBudgetExceeded:
+                        cut += 1
+                    key = (engine, budgeted)
+                    full[key] = max(full[key], (time.perf_counter() - t0) * 1e3)
+
+        print(f"\n== {size} chars, {len(inputs)} inputs ==")
+        print(f"{'detector':<24} {'worst ms':>9}  input")
+        for name, (dt, label) in sorted(worst.items(), key=lambda kv: -kv[1][0])[:10]:
+            print(f"{name:<24} {dt:>9.2f}  {label}")
+        for engine in ("sequential", "combined"):
+            print(f"detect_all {engine:<10} worst ms: {full[(engine, False)]:>8.2f} unbounded, "
+                  f"{full[(engine, True)]:>8.2f} with a {args.budget_ms:g} ms budget")
+        print(f"{cut} scans cut by the budget")
+
+
+if __name__ == "__main__":
+    main()
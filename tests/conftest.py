@@ -6,6 +6,9 @@ import logging
 import time
 
 
+# Deterministic verdicts: finish (or fail) the model load before the first request
+os.environ.setdefault("SEMANTIC_LOAD", "blocking")
+
 from fastapi.testclient import TestClient
 
 from app.main import app
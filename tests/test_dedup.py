@@ -0,0 +1,66 @@
+import random
+import time
+
+from app.detectors.patterns import dedup_hits, detect_all
+
+
+def _dedup_reference(hits):
+    deduped, used_spans = [], []
+    for h in sorted(hits, key=lambda x: (x["span"][0], -(x["span"][1] - x["span"][0]))):
+        s, e = h["span"]
+        if any(s < ue and e > us for (us, ue) in used_spans):
+            continue
+        used_spans.append((s, e))
+        deduped.append(h)
+    return deduped
+
+
+def _random_hits(rng: random.Random, n: int, width: int):
+    hits = []
+    for i in range(n):
+        s = rng.randint(0, width)
+        hits.append({"type": f"t{i % 5}", "span": (s, s + rng.randint(1, 25)), "value": str(i)})
+    return hits
+
+
+def test_dedup_matches_reference_tie_breaking():
+    rng = random.Random(7)
+    for _ in range(300):
+        hits = _random_hits(rng, rng.randint(0, 60), 120)
+        assert dedup_hits(hits) == _dedup_reference(hits)
+
+
+def test_dedup_keeps_first_detector_on_equal_spans():
+    hits = [
+        {"type": "tckn", "span": (0, 11), "value": "12345678901"},
+        {"type": "phone", "span": (0, 11), "value": "12345678901"},
+        {"type": "email", "span": (5, 30), "value": "x"},
+    ]
+    assert [h["type"] for h in dedup_hits(hits)] == ["tckn"]
+
+
+def test_dedup_stress_10k_overlapping_hits():
+    rng = random.Random(11)
+    hits = []
+    pos = 0
+    while len(hits) < 30000:
+        for k in range(3):
+            s = pos + rng.randint(0, 3)
+            hits.append({"type": f"t{k}", "span": (s, s + rng.randint(4, 20)), "value": ""})
+        pos += 25
+    t0 = time.perf_counter()
+    kept = dedup_hits(hits)
+    elapsed = time.perf_counter() - t0
+    assert len(kept) == 10000
+    # the quadratic version needed several seconds here
+    assert elapsed < 0.5
+
+
+def test_detect_all_on_log_dump():
+    lines = [
+        f"user{i}@example.com, +1 415-555-{i % 10000:04d}, 10.0.{i % 256}.{(i * 7) % 256}"
+        for i in range(2000)
+    ]
+    hits = detect_all("\n".join(lines))
+    assert sum(h["type"] == "email" for h in hits) == 2000
+    assert sum(h["type"] == "ipv4" for h in hits) == 2000
@@ -0,0 +1,53 @@
+import numpy as np
+
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.embed_cache import EmbeddingCache, cache_key
+from tests.utils.embedder import HashEmbedder
+
+
+def _clf(cache):
+    return SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), cache=cache)
+
+
+def test_cache_hit_skips_the_model():
+    clf = _clf(EmbeddingCache(100, 1 << 20))
+    first = clf.classify("my blood type is O+")
+    calls = list(clf.embedder.calls)
+    again = clf.classify("  my blood   type is O+ ")  # same text after whitespace normalization
+    assert clf.embedder.calls == calls
+    assert again == first
+    st = clf.cache.stats()
+    assert (st["hits"], st["misses"]) == (1, 1)
+
+
+def test_cached_results_match_uncached():
+    texts = ["ship to 1 Main St", "lab results", "ship to 1 Main St", "", "hello there"]
+    cached = _clf(EmbeddingCache(100, 1 << 20))
+    plain = _clf(None)
+    n_calls = len(cached.embedder.calls)
+    assert cached.classify_batch(texts) == plain.classify_batch(texts)
+    assert cached.classify_batch(texts) == plain.classify_batch(texts)
+    # duplicates inside one batch are encoded once, the second batch is all hits
+    assert cached.embedder.calls[n_calls:] == [3]
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    vec = np.ones((1, 384), dtype=np.float32)
+    by_entries = EmbeddingCache(max_entries=2, max_bytes=1 << 20)
+    for k in (b"a", b"b", b"c"):
+        by_entries.put_many([k], vec)
+    by_entries.get_many([b"b"])
+    by_entries.put_many([b"d"], vec)
+    assert [v is not None for v in by_entries.get_many([b"a", b"b", b"c", b"d"])] == [False, True, False, True]
+    assert by_entries.stats()["evictions"] == 2
+
+    by_bytes = EmbeddingCache(max_entries=100, max_bytes=2 * (vec.nbytes + 1))
+    for k in (b"a", b"b", b"c"):
+        by_bytes.put_many([k], vec)
+    assert len(by_bytes) == 2
+    assert by_bytes.stats()["bytes"] <= by_bytes.max_bytes
+
+
+def test_key_depends_on_model_name():
+    assert cache_key("m1", "hello") != cache_key("m2", "hello")
+    assert cache_key("m1", "hello  world") == cache_key("m1", " hello world ")
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+import app.main as main
+from app.executor import BoundedExecutor, Overloaded
+
+
+def test_executor_rejects_when_queue_full():
+    ex = BoundedExecutor(workers=1, queue_max=1)
+    gate = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(ex.run(gate.wait, 5))
+        queued = asyncio.ensure_future(ex.run(lambda: 42))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded) as exc:
+            await ex.run(lambda: 0)
+        assert exc.value.retry_after >= 1
+        stats = ex.stats()
+        assert (stats["running"], stats["queue_depth"], stats["rejected"]) == (1, 1, 1)
+        gate.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, 42)
+    stats = ex.stats()
+    assert stats["completed"] == 2 and stats["queue_depth"] == 0 and stats["wait_ms_max"] > 0
+    ex.shutdown()
+
+
+def test_moderate_returns_503_with_retry_after(client, monkeypatch):
+    ex = BoundedExecutor(workers=1, queue_max=0)
+    monkeypatch.setattr(main, "_executor", ex)
+    ex._admitted = 1  # one call in flight fills the executor
+
+    resp = client.post("/moderate", json={"text": "hello"})
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.post("/moderate/batch", json={"texts": ["a"]}).status_code == 503
+
+    ex._admitted = 0
+    assert client.post("/moderate", json={"text": "hello"}).status_code == 200
+    assert client.get("/healthz").json()["executor"]["rejected"] == 2
+    ex.shutdown()
@@ -0,0 +1,65 @@
+import random
+
+from app.detectors import patterns
+from app.detectors.patterns import _luhn_digits, detect_all, luhn_table
+from app.detectors.scanner import CombinedScanner
+
+
+def _numeric_text(rng: random.Random, lines: int) -> str:
+    rows = []
+    for i in range(lines):
+        card = "".join(rng.choice("0123456789") for _ in range(rng.choice((13, 15, 16, 19))))
+        sep = rng.choice([" ", "-", ""])
+        grouped = sep.join(card[j:j + 4] for j in range(0, len(card), 4))
+        rows.append(f"INV-{i:05d} qty {rng.randint(1, 99)} card {grouped} tel +90 5{rng.randint(10, 99)} "
+                    f"{rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)} total {rng.random() * 1e4:.2f}")
+    rows.append("4111 1111 1111 1111 and 4111-1111-1111-1112")
+    return "\n".join(rows)
+
+
+def test_luhn_table_matches_scalar():
+    rng = random.Random(5)
+    cands = ["".join(rng.choice("0123456789") for _ in range(rng.randint(1, 22))) for _ in range(5000)]
+    cands += ["4111111111111111", "4111111111111112", "0000000000000", "79927398713"]
+    table = luhn_table(cands)
+    for d in set(cands):
+        assert table.get(d, False) == _luhn_digits(d), d
+    assert table["4111111111111111"] and not table["4111111111111112"]
+
+
+def test_detect_all_matches_scalar_luhn(monkeypatch):
+    rng = random.Random(11)
+    scanner = CombinedScanner()
+    for lines in (1, 5, 40, 200):
+        text = _numeric_text(rng, lines)
+        batched = (detect_all(text), detect_all(text, scanner=scanner))
+        monkeypatch.setattr(patterns, "LUHN_BATCH_MIN", 10 ** 9)
+        _luhn_digits.cache_clear()
+        scalar = detect_all(text)
+        monkeypatch.undo()
+        assert batched[0] == scalar and batched[1] == scalar
+
+
+def test_card_and_phone_share_one_batch(monkeypatch):
+    calls = []
+    real = patterns.luhn_table
+
+    def counting(digits):
+        digits = list(digits)
+        calls.append(digits)
+        return real(digits)
+
+    monkeypatch.setattr(patterns, "luhn_table", counting)
+    text = _numeric_text(random.Random(2), 50)
+    for scanner in (None, CombinedScanner()):
+        calls.clear()
+        hits = detect_all(text, scanner=scanner)
+        assert len(calls) == 1
+        assert {"credit_card", "phone"} <= {h["type"] for h in hits}
+
+
+def test_non_ascii_digits():
+    fullwidth = "４１１１ １１１１ １１１１ １１１１"
+    assert patterns.luhn_ok(fullwidth) and not patterns.luhn_ok(fullwidth[:-1] + "２")
+    text = " ".join([fullwidth] + [f"4111 1111 1111 {1111 + i}" for i in range(10)])
+    assert [h["value"] for h in detect_all(text)][:1] == [fullwidth]
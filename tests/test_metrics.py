@@ -0,0 +1,54 @@
+import re
+
+import app.main as main
+from app.metrics import Histogram, ModerationMetrics
+from app.pipeline import StagedPipeline
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.semantic_utils import SemanticLoader
+from tests.utils.embedder import HashEmbedder
+
+
+def _value(body, series):
+    m = re.search(rf"^{re.escape(series)} (\S+)$", body, re.M)
+    return float(m.group(1)) if m else 0.0
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("x_seconds", "help", [0.1, 1.0], ("stage",))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v, "a")
+    lines = h.render()
+    assert 'x_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'x_seconds_bucket{stage="a",le="1"} 3' in lines
+    assert 'x_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'x_seconds_count{stage="a"} 4' in lines
+    assert any(l.startswith('x_seconds_sum{stage="a"} 3.65') for l in lines)
+
+
+def test_metrics_endpoint_counts_results_and_stages(client, monkeypatch):
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder())
+    metrics = ModerationMetrics()
+    monkeypatch.setattr(main, "SEMANTIC_ENABLED", True)
+    monkeypatch.setattr(main, "_semantic_loader", SemanticLoader(lambda: clf).start(background=False))
+    monkeypatch.setattr(main, "_metrics", metrics)
+    monkeypatch.setattr(main, "_pipeline", StagedPipeline(main._pipeline.stages, observe=metrics.observe_stage))
+
+    client.post("/moderate", json={"text": "mail john.doe@example.com"})
+    client.post("/moderate/batch", json={"texts": ["mail a@b.io", "please summarize the quarterly report"]})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+
+    assert _value(body, 'moderation_results_total{action="mask",label="sensitive",category="email"}') == 2
+    assert _value(body, "moderation_input_chars_count") == 3
+    for stage in ("regex", "policy", "heuristics", "semantic", "semantic_embed", "semantic_score", "mask"):
+        assert _value(body, f'moderation_stage_seconds_count{{stage="{stage}"}}') >= 1, stage
+    assert _value(body, 'moderation_stage_seconds_count{stage="regex"}') == 2  # one per pipeline call
+    assert re.search(r'^process_resident_memory_bytes\{pid="\d+"\} [1-9]', body, re.M)
+
+
+def test_metrics_can_be_switched_off(client, monkeypatch):
+    monkeypatch.setattr(main, "_metrics", None)
+    monkeypatch.setattr(main, "_pipeline", StagedPipeline(main._pipeline.stages))
+    assert client.get("/metrics").status_code == 404
+    assert client.post("/moderate", json={"text": "mail john.doe@example.com"}).json()["action"] == "mask"
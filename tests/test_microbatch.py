@@ -0,0 +1,58 @@
+import threading
+
+import numpy as np
+
+from app.semantic.batcher import MicroBatcher
+from tests.utils.embedder import HashEmbedder
+
+
+def test_concurrent_callers_get_their_own_rows():
+    inner = HashEmbedder()
+    batcher = MicroBatcher(inner, window_ms=20, max_batch=64)
+    texts = [f"request number {i} about blood type" for i in range(24)]
+    got = {}
+
+    def call(i):
+        got[i] = batcher.encode([texts[i]])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    for i, t in enumerate(texts):
+        assert got[i].shape == (1, 384)
+        assert np.allclose(got[i][0], HashEmbedder().encode([t])[0])
+    assert sum(inner.calls) == len(texts)
+    assert len(inner.calls) < len(texts)  # at least some coalescing happened
+
+    st = batcher.stats()
+    assert st["requests"] == len(texts)
+    assert st["batch_size_max"] > 1
+    assert sum(st["batch_size_hist"].values()) == st["batches"]
+
+
+def test_max_batch_and_multi_text_requests():
+    inner = HashEmbedder()
+    batcher = MicroBatcher(inner, window_ms=1, max_batch=4)
+    out = batcher.encode(["a b", "c d", "e f"])
+    assert out.shape == (3, 384)
+    assert batcher.encode([]).shape == (0, 384)
+    batcher.close()
+
+
+def test_encode_errors_reach_the_caller():
+    class Broken:
+        def encode(self, texts):
+            raise RuntimeError("boom")
+
+    batcher = MicroBatcher(Broken(), window_ms=1)
+    try:
+        batcher.encode(["x"])
+    except RuntimeError as e:
+        assert "boom" in str(e)
+    else:
+        raise AssertionError("expected RuntimeError")
+    batcher.close()
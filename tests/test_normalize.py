@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from app.actions.masker import mask_all
+from app.detectors.normalize import Normalizer
+from app.detectors.patterns import detect_all, normalize_whitespace
+
+FULL = Normalizer(["whitespace", "zero_width", "nfkc"])
+PIECES = ["4111 1111 1111 1111", "john.doe@example.com", "123-45-6789", "10.0.0.1", "word", "x",
+          " ", "  ", "\t", " \t ", "​", "﻿", "４１", " ", "café", "\n"]
+
+
+def _random_text(rng):
+    return "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 25)))
+
+
+def test_whitespace_step_matches_normalize_whitespace():
+    rng = random.Random(4)
+    norm = Normalizer()
+    for _ in range(2000):
+        text = _random_text(rng)
+        assert norm(text).text == normalize_whitespace(text)
+    clean = "no runs of spaces here"
+    assert norm(clean).text is clean and norm(clean).identity
+
+
+@pytest.mark.parametrize("normalizer", [None, FULL])
+def test_spans_point_into_original_text(normalizer):
+    rng = random.Random(9)
+    norm = normalizer or Normalizer()
+    for _ in range(2000):
+        text = _random_text(rng)
+        for h in detect_all(text, normalizer=normalizer):
+            s, e = h["span"]
+            assert norm(text[s:e]).text == h["value"], (text, h)
+
+
+def test_masks_land_on_original_offsets():
+    text = "card:    4111\t\t1111  1111 1111   then  mail  john.doe@example.com  ok"
+    masked = mask_all(text, detect_all(text))
+    assert masked == "card:    XXXX-XXXX-XXXX-1111   then  mail  [email masked]  ok"
+
+
+def test_zero_width_and_nfkc_steps():
+    text = "card 4111​1111​1111​1111 and mail john.doe＠example.com end"
+    assert detect_all(text) == []
+    hits = detect_all(text, normalizer=FULL)
+    assert [h["type"] for h in hits] == ["credit_card", "email"]
+    assert mask_all(text, hits) == "card XXXX-XXXX-XXXX-1111 and mail [email masked] end"
+
+
+def test_moderate_masks_original_text(client):
+    out = client.post("/moderate", json={"text": "reach me at  \t john.doe@example.com   please"}).json()
+    assert out["text"] == "reach me at  \t [email masked]   please"
@@ -0,0 +1,111 @@
+import os
+import random
+import shutil
+
+import pytest
+import yaml
+
+import app.main as main
+from app.actions.policy import POLICY_PATH, CompiledPolicy, PolicyStore
+
+TYPES = ["api_key", "api_key.aws_access_key", "api_key.potential_secret", "api_key.hex", "api_key.jwt",
+         "api_key.stripe", "credit_card", "tckn", "iban", "password", "email", "phone", "dob", "ssn",
+         "health", "ipv4", "mac", "imei", "passport", "driver_license", "medical_record_number",
+         "vehicle_registration", "qr_code", "cryptocurrency_wallet", "2fa_link", "employment_id",
+         "serial_number", "pin", "national_insurance", "address", "made_up", "made_up.sub"]
+
+
+def _reference(policy_file, hits):
+    # the dict-based decide_actions + _compute_label_category this replaced
+    data = yaml.safe_load(policy_file.read_text())
+    policy, cmap, order = data["actions"], data["categories"], data["priority"]
+    warnings, has = [], set()
+    for h in hits:
+        decision = policy.get(h["type"]) or policy.get(h["type"].split(".")[0]) or "allow"
+        has.add(decision)
+        if decision == "warn":
+            warnings.append(f"Detected {h['type']} with low/medium confidence")
+    action = next((a for a in ("block", "mask", "warn") if a in has), "allow")
+    if not hits:
+        return action, warnings, "non_sensitive", "general"
+
+    def cat(t):
+        return cmap[t] if t in cmap else cmap.get(t.split(".")[0])
+
+    mapped = [(h["type"].split(".")[0], cat(h["type"]) or cat(h["type"].split(".")[0]), h) for h in hits]
+    if any(base == "api_key" or "stripe" in h["type"] for base, _, h in mapped):
+        return action, warnings, "sensitive", "api_key"
+    for p in order:
+        if any(c == p for _, c, _ in mapped):
+            return action, warnings, "sensitive", p
+    return action, warnings, "sensitive", "other"
+
+
+@pytest.fixture
+def policy_file(tmp_path):
+    path = tmp_path / "policy.yaml"
+    shutil.copy(POLICY_PATH, path)
+    return path
+
+
+def _edit(path, actions):
+    data = yaml.safe_load(path.read_text())
+    data["actions"].update(actions)
+    path.write_text(yaml.safe_dump(data))
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+
+
+def test_compiled_policy_matches_reference(policy_file):
+    _edit(policy_file, actions={"vehicle_registration": "warn", "pin": "warn"})
+    policy = CompiledPolicy.load(policy_file)
+    rng = random.Random(0)
+    for _ in range(3000):
+        hits = [{"type": rng.choice(TYPES)} for _ in range(rng.randint(0, 6))]
+        v = policy.resolve(hits)
+        assert (v.action, v.warnings, v.label, v.category) == _reference(policy_file, hits), hits
+
+
+def test_store_swaps_on_file_change_and_keeps_old_on_error(policy_file):
+    store = PolicyStore(policy_file, check_interval=0)
+    old = store.current()
+    assert old.resolve([{"type": "email"}]).action == "mask"
+
+    _edit(policy_file, actions={"email": "block"})
+    swapped, new = store.reload()
+    assert swapped and new.version != old.version
+    assert store.current().resolve([{"type": "email"}]).action == "block"
+    assert old.resolve([{"type": "email"}]).action == "mask"  # in-flight requests keep their object
+
+    policy_file.write_text("actions: {email: explode}")
+    assert store.reload() == (False, new) and "explode" in store.last_error
+
+
+def test_store_polls_file_mtime(policy_file):
+    store = PolicyStore(policy_file, check_interval=1e-9)
+    _edit(policy_file, actions={"phone": "block"})
+    assert store.current().resolve([{"type": "phone"}]).action == "block"
+    assert store.reloads == 1
+
+
+def test_admin_reload_endpoint(client, monkeypatch, policy_file):
+    monkeypatch.setattr(main, "_policy", PolicyStore(policy_file, check_interval=0))
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    text = "mail john.doe@example.com"
+    assert client.post("/moderate", json={"text": text}).json()["action"] == "mask"
+
+    _edit(policy_file, actions={"email": "block"})
+    assert client.post("/moderate", json={"text": text}).json()["action"] == "mask"  # polling off
+    assert client.post("/admin/policy/reload").status_code == 403
+    resp = client.post("/admin/policy/reload", headers={"X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200 and resp.json()["reloaded"]
+
+    blocked = client.post("/moderate", json={"text": text})
+    assert blocked.status_code == 422
+    assert "email" in blocked.json()["detail"]["enforcement"]["block"]
+    assert client.get("/healthz").json()["policy"]["version"] == resp.json()["version"]
+
+    policy_file.write_text("actions: [")
+    bad = client.post("/admin/policy/reload", headers={"X-Admin-Token": "s3cret"})
+    assert bad.status_code == 400
+    assert client.post("/moderate", json={"text": text}).status_code == 422
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+import app.main as main
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.semantic_utils import SemanticLoader
+from tests.utils.embedder import HashEmbedder
+
+
+@pytest.fixture
+def gated_loader(monkeypatch):
+    gate = threading.Event()
+
+    def load():
+        gate.wait(5)
+        return SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder())
+
+    loader = SemanticLoader(load).start()
+    monkeypatch.setattr(main, "SEMANTIC_ENABLED", True)
+    monkeypatch.setattr(main, "_semantic_loader", loader)
+    yield gate, loader
+    gate.set()
+    loader.wait(5)
+
+
+def test_pending_model_serves_regex_path(client, gated_loader):
+    gate, loader = gated_loader
+    assert loader.state == "pending"
+
+    assert client.get("/healthz").status_code == 200
+    resp = client.get("/readyz")
+    assert resp.status_code == 503
+    assert resp.json()["semantic"]["state"] == "pending"
+
+    out = client.post("/moderate", json={"text": "my email is john.doe@example.com"}).json()
+    assert out["action"] == "mask"
+    assert main.SEMANTIC_PENDING_WARNING not in (out["warnings"] or [])  # mask is final here
+    batch = client.post("/moderate/batch", json={"texts": ["hello there"]}).json()["results"]
+    assert main.SEMANTIC_PENDING_WARNING in batch[0]["warnings"]
+    # verdicts the model cannot change are not flagged
+    blocked = client.post("/moderate", json={"text": "card 4111 1111 1111 1111"})
+    assert main.SEMANTIC_PENDING_WARNING not in blocked.json()["detail"]["warnings"]
+    address = client.post("/moderate", json={"text": "ship to 221 Baker street, London please"}).json()
+    assert main.SEMANTIC_PENDING_WARNING not in address["warnings"]
+
+    gate.set()
+    assert loader.wait(5)
+    resp = client.get("/readyz")
+    assert resp.status_code == 200
+    status = resp.json()["semantic"]
+    assert status["state"] == "ready"
+    assert status["load_ms"] is not None and "bank_ms" in status
+    out = client.post("/moderate", json={"text": "hello there"}).json()
+    assert main.SEMANTIC_PENDING_WARNING not in (out["warnings"] or [])
+
+
+def test_failed_load_is_ready_without_semantic():
+    def boom():
+        raise RuntimeError("no weights")
+
+    loader = SemanticLoader(boom).start(background=False)
+    assert loader.state == "failed"
+    assert loader.get() is None and not loader.pending
+
+
+def test_disabled_loader_never_pending():
+    loader = SemanticLoader(lambda: None, enabled=False).start()
+    assert loader.state == "disabled" and loader.wait(0)
@@ -0,0 +1,75 @@
+import random
+import re
+import time
+
+import pytest
+
+import app.main as main
+from app.detectors.patterns import DETECTORS_BY_NAME, ScanBudget, ScanBudgetExceeded, detect_all, find_matches
+from app.detectors.scanner import CombinedScanner
+
+# the backtracking-prone originals the linear finders replace
+ORIGINAL = {
+    "email": re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"),
+    "jwt": re.compile(r"\b[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\b"),
+    "2fa_link": re.compile(r"https?://[^\s]*2fa[^\s]*recovery[^\s]*", re.IGNORECASE),
+}
+ALPHABET = ["a", "B", "1", "_", "-", ".", "@", "%", "+", " ", "\t", "é", "x.y", "http://", "HTTPS://",
+            "2fa", "2FA", "recovery", "ReCoVeRy", "/", ":", "com", "ſ"]
+
+PATHOLOGICAL = {
+    "email": "a." * 20000 + "x",
+    "jwt": "token " + "a-" * 20000 + " x.y",
+    "2fa_link": "http://" + "2fa" * 20000,
+}
+
+
+@pytest.mark.parametrize("name", sorted(ORIGINAL))
+def test_linear_finders_match_original_patterns(name):
+    det = DETECTORS_BY_NAME[name]
+    rng = random.Random(name)
+    for _ in range(5000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30)))
+        want = [(m.start(), m.end(), m.group()) for m in ORIGINAL[name].finditer(text)]
+        got = [m for m in find_matches(det, text) if det.validate is None or name != "2fa_link"
+               or det.validate(text, *m)]
+        assert got == want, text
+
+
+@pytest.mark.parametrize("name", sorted(PATHOLOGICAL))
+def test_pathological_inputs_scan_in_linear_time(name):
+    text = PATHOLOGICAL[name]
+    for scanner in (None, CombinedScanner()):
+        t0 = time.perf_counter()
+        detect_all(text, scanner=scanner)
+        assert time.perf_counter() - t0 < 0.5
+
+
+def test_budget_exceeded_returns_partial_hits():
+    text = "mail john.doe@example.com " + "4111 1111 1111 1111 " * 5000
+    for scanner in (None, CombinedScanner()):
+        with pytest.raises(ScanBudgetExceeded) as exc:
+            detect_all(text, scanner=scanner, budget=ScanBudget(0.001))
+        assert all(h in detect_all(text, scanner=scanner) for h in exc.value.hits)
+
+
+@pytest.mark.parametrize("fallback", ["block", "partial"])
+def test_endpoint_fallbacks(client, monkeypatch, fallback):
+    monkeypatch.setattr(main, "DETECTOR_FALLBACK", fallback)
+    monkeypatch.setattr(main, "DETECTOR_MAX_CHARS", 40)
+    text = "my email is john.doe@example.com and then some more words"
+    resp = client.post("/moderate", json={"text": text})
+    if fallback == "block":
+        assert resp.status_code == 422
+        assert resp.json()["detail"]["category"] == "unscanned"
+    else:
+        out = resp.json()
+        assert out["action"] == "mask" and "[email masked]" in out["text"]
+        assert any(w.startswith("scan incomplete") for w in out["warnings"])
+
+    monkeypatch.setattr(main, "DETECTOR_MAX_CHARS", 0)
+    monkeypatch.setattr(main, "DETECTOR_BUDGET_MS", 1e-6)
+    resp = client.post("/moderate/batch", json={"texts": [text]}).json()["results"][0]
+    assert any(w.startswith("scan incomplete") for w in resp["warnings"])
+    if fallback == "block":
+        assert resp["action"] == "block" and resp["category"] == "unscanned"
@@ -0,0 +1,119 @@
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+import yaml
+
+import app.main as main
+from app.semantic.bank import ReferenceBank
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.rules_loader import RULES_PATH
+from app.semantic.semantic_utils import SemanticLoader
+from tests.utils.embedder import HashEmbedder
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "rules.yaml"
+    shutil.copy(RULES_PATH, path)
+    return path
+
+
+def _edit(path, fn):
+    data = yaml.safe_load(path.read_text())
+    fn(data)
+    path.write_text(yaml.safe_dump(data, allow_unicode=True))
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 5))
+
+
+def _add_drop(data):
+    health = data["categories"]["health"]
+    health["positives"] = health["positives"][1:] + ["my insulin pump settings", "dialysis schedule"]
+    data["categories"]["pets"] = {"positives": ["my dog's vaccination record"]}
+
+
+def test_rebuild_matches_full_build(rules_file):
+    emb = HashEmbedder()
+    old = ReferenceBank.build(yaml.safe_load(rules_file.read_text()), emb.encode)
+    _edit(rules_file, _add_drop)
+    rules = yaml.safe_load(rules_file.read_text())
+
+    emb.calls.clear()
+    new, stats = old.rebuild(rules, emb.encode)
+    full = ReferenceBank.build(rules, HashEmbedder().encode)
+    assert emb.calls == [3]  # only the added phrases are encoded
+    assert stats["encoded"] == 3 and stats["dropped"] == 1
+    assert new.categories == full.categories and new.texts == full.texts
+    assert np.array_equal(new.pos_bounds, full.pos_bounds) and np.array_equal(new.neg_bounds, full.neg_bounds)
+    assert np.allclose(new.matrix, full.matrix)
+
+
+def test_reload_swaps_bank_and_keeps_old_on_error(rules_file):
+    emb = HashEmbedder()
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=emb, rules_path=rules_file)
+    old = clf.bank
+    assert clf.reload_rules() is False and clf.bank is old  # unchanged file
+
+    _edit(rules_file, _add_drop)
+    emb.calls.clear()
+    assert clf.reload_rules() is True
+    assert emb.calls == [3] and clf.bank is not old and "pets" in clf.bank.categories
+    assert "pets" not in old.categories  # the old bank object is never modified
+    fresh = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), rules_path=rules_file)
+    texts = ["my dog's vaccination record is due", "blood test results", "ship to 221 Baker street"]
+    assert clf.classify_batch(texts) == fresh.classify_batch(texts)
+
+    rules_file.write_text("categories: [")
+    assert clf.reload_rules() is False and clf.rules_last_error
+    assert "pets" in clf.bank.categories
+
+
+def test_classify_during_reload_sees_one_bank(rules_file):
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), rules_path=rules_file)
+    texts = ["my dog's vaccination record is due", "blood test results"]
+    before = clf.classify_batch(texts)
+    _edit(rules_file, _add_drop)
+    after = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(),
+                               rules_path=rules_file).classify_batch(texts)
+
+    stop, seen = threading.Event(), []
+
+    def reader():
+        while not stop.is_set():
+            seen.append(clf.classify_batch(texts))
+
+    t = threading.Thread(target=reader)
+    t.start()
+    clf.reload_rules()
+    stop.set()
+    t.join()
+    assert seen and all(r in (before, after) for r in seen)
+
+
+def test_poll_picks_up_file_change(rules_file):
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), rules_path=rules_file)
+    _edit(rules_file, _add_drop)
+    clf.poll_rules(0)  # polling off
+    assert clf.rules_reloads == 0
+    clf.poll_rules(1e-9)
+    assert clf.rules_reloads == 1 and "pets" in clf.bank.categories
+
+
+def test_admin_rules_reload_endpoint(client, monkeypatch, rules_file):
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), rules_path=rules_file)
+    monkeypatch.setattr(main, "SEMANTIC_ENABLED", True)
+    monkeypatch.setattr(main, "_semantic_loader", SemanticLoader(lambda: clf).start(background=False))
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/rules/reload").status_code == 403
+
+    _edit(rules_file, _add_drop)
+    resp = client.post("/admin/rules/reload", headers={"X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200 and resp.json()["reloaded"]
+    assert resp.json()["last_reload"]["encoded"] == 3
+    assert client.get("/healthz").json()["reference_bank"]["rules"]["reloads"] == 1
+
+    rules_file.write_text("- not a mapping")
+    assert client.post("/admin/rules/reload", headers={"X-Admin-Token": "s3cret"}).status_code == 400
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+from app.semantic.bank import ReferenceBank
+from app.semantic.classifier import SemanticClassifier
+from app.semantic.models import LocalEmbedder
+from tests.utils.embedder import HashEmbedder
+
+RULES = {"categories": {
+    "a": {"positives": ["p1", "p2", "p3"], "negatives": ["n1"]},
+    "b": {"positives": ["q1"], "negatives": []},
+    "c": {"positives": [], "negatives": ["m1", "m2"]},
+    "d": {"positives": ["r1", "r2"], "negatives": ["o1", "o2", "o3"]},
+}}
+
+
+def _bank():
+    rng = np.random.default_rng(3)
+
+    def encode(texts):
+        x = rng.standard_normal((len(texts), 384)).astype(np.float32)
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    return ReferenceBank.build(RULES, encode)
+
+
+def test_segment_max_matches_per_category_max():
+    bank = _bank()
+    Q = bank.matrix[[0, 4, 7]] + 0.1
+    S = bank.similarities(Q)
+    pos_max, neg_max = bank.segment_max(S)
+    for c in range(len(bank.categories)):
+        for bounds, got in ((bank.pos_bounds[c], pos_max[:, c]), (bank.neg_bounds[c], neg_max[:, c])):
+            s, e = bounds
+            want = S[:, s:e].max(axis=1) if e > s else np.zeros(len(Q))
+            assert np.allclose(got, want)
+
+
+def test_top_k_sorted_and_bounded():
+    bank = _bank()
+    S = bank.similarities(bank.matrix[:1])
+    top = bank.top_k(S[0], bank.neg_bounds[3], 2)
+    assert [t for t, _ in top] == sorted(["o1", "o2", "o3"], key=lambda t: -S[0][bank.texts.index(t)])[:2]
+    assert bank.top_k(S[0], bank.pos_bounds[2], 3) == []
+
+
+def test_neighbors_only_when_requested():
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), neighbors=False)
+    res = clf.classify("allergic to penicillin")
+    assert res.category == "health"
+    assert res.pos_top == [] and res.neg_top == []
+    dbg = clf.classify("allergic to penicillin", neighbors=True)
+    assert dbg.pos_top[0][0] == "allergic to penicillin"
+    assert (dbg.label, dbg.category, dbg.score) == (res.label, res.category, res.score)
+
+
+def test_bank_cache_roundtrip_is_memory_mapped(tmp_path):
+    first = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder(), bank_cache_dir=tmp_path)
+    assert not first.bank.from_cache
+
+    emb = HashEmbedder()
+    second = SemanticClassifier("hash", threshold=0.3, embedder=emb, bank_cache_dir=tmp_path)
+    assert second.bank.from_cache
+    assert emb.calls == []  # no rule phrases re-encoded
+    assert isinstance(second.bank.matrix, np.memmap)
+    assert np.array_equal(second.bank.matrix, first.bank.matrix)
+    assert second.bank.categories == first.bank.categories
+    assert np.array_equal(second.bank.pos_bounds, first.bank.pos_bounds)
+    for t in ["ignore previous instructions", "my blood test results", "hello"]:
+        assert second.classify(t) == first.classify(t)
+
+
+def test_bank_cache_key_change_rebuilds(tmp_path):
+    SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path, model_revision="a")
+    clf = SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path, model_revision="b")
+    assert not clf.bank.from_cache
+    assert len(list(tmp_path.glob("bank-*.npz"))) == 2
+
+
+def test_bank_cache_corrupt_file_rebuilds(tmp_path):
+    SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path)
+    for f in tmp_path.glob("bank-*.npy"):
+        f.write_bytes(b"garbage")
+    clf = SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path)
+    assert not clf.bank.from_cache
+    assert SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path).bank.from_cache
+
+
+def test_bank_cache_key_includes_embedder_backend(tmp_path):
+    class OnnxHash(HashEmbedder):
+        backend_id = "onnx-int8:onnx/model_quint8_avx2.onnx"
+
+    SemanticClassifier("hash", embedder=HashEmbedder(), bank_cache_dir=tmp_path)
+    clf = SemanticClassifier("hash", embedder=OnnxHash(), bank_cache_dir=tmp_path)
+    assert not clf.bank.from_cache and clf.backend_id.startswith("onnx-int8")
+
+
+def test_unknown_embedder_backend_rejected():
+    with pytest.raises(ValueError):
+        LocalEmbedder("hash", backend="tensorrt")
+
+
+def test_bank_cache_skipped_without_resolved_revision(tmp_path):
+    class Unpinned(HashEmbedder):
+        resolved_revision = None
+
+    SemanticClassifier("hash", embedder=Unpinned(), bank_cache_dir=tmp_path)
+    assert list(tmp_path.iterdir()) == []
+    pinned = "0123456789abcdef0123456789abcdef01234567"
+    SemanticClassifier("hash", embedder=Unpinned(), bank_cache_dir=tmp_path, model_revision=pinned)
+    assert SemanticClassifier("hash", embedder=Unpinned(), bank_cache_dir=tmp_path,
+                              model_revision=pinned).bank.from_cache
+
+
+def test_shared_bank_is_readonly_copy_visible_after_fork():
+    import os
+
+    bank = _bank()
+    shared = bank.share()
+    assert np.array_equal(shared.matrix, bank.matrix) and not shared.matrix.flags.writeable
+    assert shared.categories == bank.categories
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if np.array_equal(shared.matrix, bank.matrix) else 1)
+    assert os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]) == 0
+
+
+def test_after_fork_restarts_micro_batcher():
+    from app.semantic.batcher import MicroBatcher
+    from app.semantic.semantic_utils import after_fork, prepare_for_fork
+
+    clf = SemanticClassifier("hash", threshold=0.3, embedder=HashEmbedder())
+    clf.embedder = MicroBatcher(clf.embedder, window_ms=1.0, max_batch=8)
+    want = clf.classify("my blood test results")
+    prepare_for_fork(clf)
+    after_fork(clf)
+    assert clf.embedder._thread.is_alive() and clf.embedder.max_batch == 8
+    assert clf.classify("my blood test results") == want
+    clf.embedder.close()
@@ -0,0 +1,33 @@
+import hashlib
+import re
+
+import numpy as np
+
+DIM = 384
+
+
+class HashEmbedder:
+    """
+    Deterministic stand-in for LocalEmbedder (bag of hashed tokens, L2-normalized),
+    so semantic scoring can be tested without downloading a model.
+    """
+
+    resolved_revision = "hash-v1"  # deterministic, so the bank disk cache may be used
+
+    def __init__(self, dim: int = DIM):
+        self.dim = dim
+        self.calls = []  # batch sizes, one entry per encode() call
+
+    def _vec(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for tok in re.findall(r"\w+", text.lower()):
+            h = int(hashlib.md5(tok.encode("utf-8")).hexdigest(), 16)
+            v[h % self.dim] += 1.0 if (h >> 64) % 2 else -1.0
+        n = np.linalg.norm(v)
+        return v / n if n else v
+
+    def encode(self, texts):
+        if not texts:
+            return np.empty((0, self.dim))
+        self.calls.append(len(texts))
+        return np.stack([self._vec(t) for t in texts])